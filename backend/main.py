@@ -1,28 +1,82 @@
-import uvicorn
 import io
+import itertools
+import os
 import re
 import json
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Iterator, List, Optional
 
 from fastapi import FastAPI, HTTPException
-from fastapi import File
+from fastapi import Body, File, Query
 from fastapi import UploadFile
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, field_validator, ValidationError
 
 from src.pipelines.pipeline import pipeline_training
-from src.pipelines.pipeline_eda import pipeline_eda
-from src.evaluate.evaluate import pipeline_evaluate, evaluate_from_input
+from src.pipelines.pipeline_eda import (
+    pipeline_eda,
+    pipeline_freq_words,
+    pipeline_eda_aggregates,
+    get_eda_version,
+)
+from src.data.eda_cache import (
+    serialize_eda_data,
+    select_eda_columns,
+    COLUMNAR_FORMATS,
+)
+from src.evaluate.evaluate import (
+    pipeline_evaluate,
+    pipeline_evaluate_stream,
+    pipeline_scrape_evaluate_stream,
+    evaluate_batch,
+    get_sentiment_stats,
+)
+from src.evaluate.registry import registry
+from src.evaluate.batcher import MicroBatcher
 from src.train.metrics import load_metrics
 from src.data.get_reviews import get_reviews
+from src.jobs.jobs import jobs, TrainingProgressCallback
+from src.serving.prefork import serve_prefork
+from src.serving.streaming import iterate_in_thread
 
 import warnings
 
 warnings.filterwarnings("ignore")
 
 
-app = FastAPI()
-
 CONFIG_PATH = "../config/config.yaml"
 
+batcher = MicroBatcher(
+    config_path=CONFIG_PATH,
+    predict_fn=lambda texts: evaluate_batch(config_path=CONFIG_PATH, texts=texts),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Загрузка обученной модели и токенизатора один раз при старте сервиса,
+    подключение к хранилищу фоновых задач, запуск очереди объединения
+    запросов в батчи
+    """
+    # Если модель еще не обучена, она будет загружена после /train.
+    # В режиме pre-fork модель уже загружена главным процессом
+    if not registry.is_loaded:
+        registry.load(config_path=CONFIG_PATH)
+    # Состояние фоновых задач общее для всех рабочих процессов
+    jobs.configure(config_path=CONFIG_PATH)
+    await batcher.start()
+    yield
+    await batcher.stop()
+    if registry.cache is not None:
+        registry.cache.flush()
+
+
+app = FastAPI(lifespan=lifespan)
+
 
 @app.get("/hello")
 def welcome():
@@ -57,6 +111,14 @@ class SentimentRequest(BaseModel):
         return s
 
 
+class BatchItem(SentimentRequest):
+    """
+    Валидация отзыва из пакетного запроса с необязательным идентификатором клиента
+    """
+
+    id: Optional[str] = None
+
+
 class URLRequest(BaseModel):
     """
     Валидации введенного URL-запроса
@@ -84,11 +146,30 @@ class URLRequest(BaseModel):
 
 
 @app.post("/compute_eda")
-def get_eda_stats():
+def get_eda_stats(
+    fmt: str = Query("json", alias="format"),
+    columns: Optional[List[str]] = Query(None),
+    rows: Optional[int] = None,
+):
     """
-    Получение статистика для EDA
+    Получение статистика для EDA: format=json - CSV в JSON,
+    format=parquet/arrow - сжатый колоночный формат; columns - выбор столбцов;
+    rows - только первые строки (для предпросмотра)
     """
     eda_data, words, count = pipeline_eda(config_path=CONFIG_PATH)
+    if rows is not None:
+        eda_data = eda_data.head(rows)
+
+    try:
+        eda_data = select_eda_columns(eda_data, columns)
+        if fmt != "json":
+            content = serialize_eda_data(eda_data, words, count, fmt=fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if fmt != "json":
+        return Response(content=content, media_type=COLUMNAR_FORMATS[fmt])
+
     buffer = io.StringIO()
     eda_data.to_csv(buffer, index=False)
     buffer.seek(0)
@@ -99,24 +180,117 @@ def get_eda_stats():
     return {"data_csv": buffer.getvalue(), "words": words_json, "count": count_json}
 
 
+@app.get("/eda_version")
+def eda_version():
+    """
+    Версия данных для EDA: меняется при изменении обучающего датасета,
+    используется клиентами как ключ кэша
+    """
+    return {"version": get_eda_version(config_path=CONFIG_PATH)}
+
+
+@app.get("/eda_aggregates")
+def eda_aggregates():
+    """
+    Агрегаты для графиков EDA по классам: распределение классов, статистики
+    бокплотов и сетки оценок плотности признаков
+    """
+    return pipeline_eda_aggregates(config_path=CONFIG_PATH)
+
+
+@app.get("/most_freq_words")
+def most_freq_words(
+    source: str = "train",
+    k: int = 30,
+    target: Optional[int] = None,
+    ngram: int = 1,
+    lemmatize: Optional[bool] = None,
+):
+    """
+    Самые частые слова или биграммы обучающего датасета (source=train),
+    собранных с сайта отзывов (source=scrape) или отзывов, загруженных для
+    предсказания (source=upload), в том числе по классам;
+    для обучающего датасета доступен подсчет по леммам
+    """
+    words, count = pipeline_freq_words(
+        config_path=CONFIG_PATH,
+        source=source,
+        k=k,
+        target=target,
+        ngram=ngram,
+        lemmatize=lemmatize,
+    )
+
+    return {"words": words, "count": count}
+
+
 @app.post("/train")
-def training():
+def training(freeze_backbone: Optional[bool] = None):
     """
-    Обучение модели, логирование метрик
+    Запуск обучения модели и логирования метрик в фоне,
+    возвращает идентификатор задачи
+    При freeze_backbone=True обучается только классификационная голова
+    на сохраненных выходах энкодера (по умолчанию - из конфигурации)
     """
 
-    pipeline_training(config_path=CONFIG_PATH, requires_grad=True)
-    metrics = load_metrics(config_path=CONFIG_PATH)
 
-    return {"metrics": metrics}
+    def run_training(report):
+        pipeline_training(
+            config_path=CONFIG_PATH,
+            requires_grad=None if freeze_backbone is None else not freeze_backbone,
+            callbacks=[TrainingProgressCallback(report)],
+        )
+        # Перезагрузка модели в реестре после сохранения новой версии
+        registry.load(config_path=CONFIG_PATH)
+
+        return {"metrics": load_metrics(config_path=CONFIG_PATH)}
+
+    return {"job_id": jobs.submit("train", run_training)}
+
+
+def stream_with_cleanup(lines: Iterator[str], path: str) -> Iterator[str]:
+    """
+    Отдача строк ответа с удалением временного файла по завершении генератора,
+    в том числе при ошибке и отключении клиента
+    :param lines: строки ответа
+    :param path: путь к временному файлу
+    :return: строки ответа
+    """
+    try:
+        yield from lines
+    finally:
+        lines.close()
+        os.remove(path)
 
 
 @app.post("/predict")
-def prediction(file: UploadFile = File(...)):
+def prediction(file: UploadFile = File(...), stream: bool = False):
     """
     Предсказание модели по данным из файла
+    При stream=True файл обрабатывается частями, а предсказания отдаются
+    построчно в формате NDJSON по мере готовности
     """
 
+    if stream:
+        # Копия загрузки на диск, чтобы файл был доступен во время отдачи ответа
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as tmp_file:
+            shutil.copyfileobj(file.file, tmp_file)
+
+        predictions = stream_with_cleanup(
+            pipeline_evaluate_stream(config_path=CONFIG_PATH, data_path=tmp_file.name),
+            tmp_file.name,
+        )
+        # Первая часть файла проверяется и классифицируется до начала ответа:
+        # ошибки формата файла возвращаются с кодом 400, а не обрывают ответ 200
+        try:
+            first = next(predictions)
+        except (ValueError, TypeError, KeyError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return StreamingResponse(
+            itertools.chain([first], predictions), media_type="application/x-ndjson"
+        )
+
     predictions, stats = pipeline_evaluate(config_path=CONFIG_PATH, data_path=file.file)
 
     assert isinstance(predictions, list), "Результат не соответствует типу list"
@@ -125,15 +299,13 @@ def prediction(file: UploadFile = File(...)):
 
 
 @app.post("/predict_from_input")
-def prediction_from_input(request: SentimentRequest):
+async def prediction_from_input(request: SentimentRequest):
     """
     Предсказание модели по введенному тексту отзыва
     """
 
     try:
-        probabilities, predicted_label = evaluate_from_input(
-            config_path=CONFIG_PATH, text=request.text
-        )
+        probabilities, predicted_label = await batcher.predict(request.text)
 
         return {"Probabilities": probabilities, "Predicted_label": predicted_label}
 
@@ -141,18 +313,89 @@ def prediction_from_input(request: SentimentRequest):
         raise HTTPException(status_code=400, detail=e.errors())
 
 
+@app.post("/predict_batch")
+def prediction_batch(items: List[BatchItem] = Body(..., min_length=1, max_length=1000)):
+    """
+    Предсказание модели по списку отзывов, переданных в формате JSON
+    """
+
+    results = evaluate_batch(
+        config_path=CONFIG_PATH, texts=[item.text for item in items]
+    )
+    predictions = [
+        {"id": item.id, "Probabilities": probabilities, "Predicted_label": label}
+        for item, (probabilities, label) in zip(items, results)
+    ]
+    label2id = registry.model.config.label2id
+    stats = get_sentiment_stats([label2id[label] for _, label in results])
+
+    return {"predictions": predictions, "stats": stats}
+
+
+@app.get("/cache_stats")
+def cache_stats():
+    """
+    Статистика кэша предсказаний: попадания, промахи, версия модели
+    """
+
+    if registry.cache is None:
+        return {"hits": 0, "misses": 0, "hit_rate": 0.0, "memory_size": 0}
+
+    return registry.cache.stats()
+
+
 @app.post("/scrape")
 def scrape_data_from_url(request: URLRequest):
-    """Получение отзывов с сайта Otzovik.com"""
+    """
+    Запуск получения отзывов с сайта Otzovik.com в фоне,
+    возвращает идентификатор задачи
+    """
 
-    try:
-        get_reviews(
-            config_path=CONFIG_PATH, url=request.url, page_count=request.page_count
+    def run_scraping(report):
+        return get_reviews(
+            config_path=CONFIG_PATH,
+            url=request.url,
+            page_count=request.page_count,
+            progress=report,
         )
 
-    except ValidationError as e:
-        raise HTTPException(status_code=400, detail=e.errors)
+    return {"job_id": jobs.submit("scrape", run_scraping)}
+
+
+@app.post("/scrape_predict")
+def scrape_and_predict(request: URLRequest):
+    """
+    Парсинг отзывов с сайта Otzovik.com с классификацией по мере получения:
+    предсказания по новым отзывам и текущая статистика отдаются построчно
+    в формате NDJSON после каждой страницы
+    """
+    # Парсинг выполняется целиком в одном потоке: соединение с хранилищем
+    # состояния парсинга нельзя использовать из других потоков
+    return StreamingResponse(
+        iterate_in_thread(
+            partial(
+                pipeline_scrape_evaluate_stream,
+                config_path=CONFIG_PATH,
+                url=request.url,
+                page_count=request.page_count,
+            )
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Статус фоновой задачи: прогресс, время выполнения и результат
+    """
+
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+
+    return job
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=80)
+    serve_prefork(app, config_path=CONFIG_PATH)
@@ -0,0 +1,78 @@
+"""
+Программа хранения состояния парсинга: обработанные страницы списка
+отзывов и собранные ссылки на отзывы
+Версия 1.0
+"""
+
+import os
+import sqlite3
+import time
+from typing import Iterable, Set
+
+
+class CrawlCheckpoint:
+    """
+    Состояние парсинга в SQLite: повторный запуск пропускает недавно
+    обработанные страницы списка и уже собранные отзывы
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, visited_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS reviews (href TEXT PRIMARY KEY, scraped_at REAL)"
+        )
+        self.conn.commit()
+
+    def is_page_visited(self, url: str, max_age: float) -> bool:
+        """
+        Проверка, была ли страница списка обработана недавно
+        :param url: адрес страницы списка
+        :param max_age: срок, в течение которого страница не обрабатывается повторно
+        :return: True, если страница обработана не позднее max_age секунд назад
+        """
+        row = self.conn.execute(
+            "SELECT visited_at FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+
+        return row is not None and time.time() - row[0] < max_age
+
+    def get_seen(self, hrefs: Iterable[str]) -> Set[str]:
+        """
+        Уже собранные отзывы среди ссылок
+        :param hrefs: ссылки на отзывы
+        :return: множество собранных ссылок
+        """
+        hrefs = list(hrefs)
+        if not hrefs:
+            return set()
+
+        rows = self.conn.execute(
+            f"SELECT href FROM reviews WHERE href IN ({','.join('?' * len(hrefs))})",
+            hrefs,
+        ).fetchall()
+
+        return {row[0] for row in rows}
+
+    def mark_page(self, url: str, hrefs: Iterable[str]) -> None:
+        """
+        Отметка страницы списка и ее отзывов как обработанных
+        :param url: адрес страницы списка
+        :param hrefs: ссылки на собранные отзывы страницы
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO reviews VALUES (?, ?)",
+                [(href, now) for href in hrefs],
+            )
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?)", (url, now))
+
+    def close(self) -> None:
+        """
+        Закрытие соединения
+        """
+        self.conn.close()
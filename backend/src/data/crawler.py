@@ -0,0 +1,248 @@
+"""
+Программа загрузки страниц сайта в несколько потоков с общей сессией,
+ограничением частоты запросов к хосту и повторами при ошибках сервера
+Версия 1.0
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Коды ответа, при которых запрос повторяется
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Ограничение частоты запросов: в корзину поступает rate токенов в секунду,
+    не более capacity; каждый запрос забирает один токен
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Получение токена; если корзина пуста - ожидание его поступления
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """
+    Отдельная корзина токенов для каждого хоста
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url: str) -> None:
+        """
+        Ожидание разрешения на запрос к хосту
+        :param url: адрес запроса
+        """
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.setdefault(
+                host, TokenBucket(self.rate, self.capacity)
+            )
+        bucket.acquire()
+
+
+def get_session(pool_size: int = 10) -> requests.Session:
+    """
+    Создание сессии с пулом соединений на все потоки загрузки
+    :param pool_size: размер пула соединений
+    :return session
+    """
+    session = requests.Session()
+    retry = Retry(connect=3, backoff_factor=0.5)
+    adapter = HTTPAdapter(
+        max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class ResponseCache:
+    """
+    Кэш ответов на диске: текст страницы и метаданные (ETag, Last-Modified,
+    время загрузки); устаревшие записи проверяются условным запросом
+    """
+
+    def __init__(self, cache_dir: str, ttl: float = 3600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get_paths(self, url: str) -> tuple:
+        """
+        Пути к файлам записи кэша
+        :param url: адрес страницы
+        :return: путь к тексту страницы, путь к метаданным
+        """
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        path = os.path.join(self.cache_dir, key)
+
+        return f"{path}.html", f"{path}.json"
+
+    def load(self, url: str) -> Optional[dict]:
+        """
+        Загрузка записи кэша
+        :param url: адрес страницы
+        :return: метаданные с текстом страницы (body) или None
+        """
+        body_path, meta_path = self.get_paths(url)
+        if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+            return None
+
+        with open(meta_path) as file:
+            entry = json.load(file)
+        with open(body_path, encoding="utf-8") as file:
+            entry["body"] = file.read()
+
+        return entry
+
+    def save(self, url: str, body: Optional[str], headers: dict) -> None:
+        """
+        Сохранение ответа; без текста страницы обновляются только метаданные
+        (ответ 304 - страница не изменилась)
+        :param url: адрес страницы
+        :param body: текст страницы
+        :param headers: заголовки ответа
+        """
+        body_path, meta_path = self.get_paths(url)
+
+        if body is not None:
+            with open(f"{body_path}.tmp", "w", encoding="utf-8") as file:
+                file.write(body)
+            os.replace(f"{body_path}.tmp", body_path)
+
+        meta = {"etag": None, "last_modified": None}
+        if body is None and os.path.exists(meta_path):
+            # Ответ 304 может не содержать валидаторы - сохраняются прежние
+            with open(meta_path) as file:
+                meta = json.load(file)
+
+        meta.update(
+            url=url,
+            fetched_at=time.time(),
+            etag=headers.get("ETag", meta["etag"]),
+            last_modified=headers.get("Last-Modified", meta["last_modified"]),
+        )
+        with open(f"{meta_path}.tmp", "w") as file:
+            json.dump(meta, file)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+
+class Crawler:
+    """
+    Загрузка страниц через общую сессию с ограничением частоты запросов;
+    ответы 429/5xx повторяются с экспоненциальной задержкой, загруженные
+    страницы сохраняются в кэш ответов (при наличии)
+    """
+
+    def __init__(
+        self,
+        headers: dict,
+        cookies: dict,
+        concurrency: int = 8,
+        rate: float = 4.0,
+        burst: int = 4,
+        max_retries: int = 4,
+        backoff: float = 0.5,
+        timeout: float = 30.0,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.headers = headers
+        self.cookies = cookies
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.session = get_session(pool_size=concurrency)
+        self.limiter = RateLimiter(rate, burst)
+
+    def fetch(self, url: str, max_age: Optional[float] = None) -> str:
+        """
+        Загрузка страницы; свежая запись кэша возвращается без запроса,
+        устаревшая проверяется условным запросом по ETag/Last-Modified
+        :param url: адрес страницы
+        :param max_age: срок свежести записи кэша, секунды; None - из кэша
+        :return: текст страницы
+        """
+        entry = self.cache.load(url) if self.cache is not None else None
+        headers = dict(self.headers)
+
+        if entry is not None:
+            max_age = self.cache.ttl if max_age is None else max_age
+            if time.time() - entry["fetched_at"] < max_age:
+                return entry["body"]
+
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(url)
+            response = self.session.get(
+                url, headers=headers, cookies=self.cookies, timeout=self.timeout
+            )
+
+            if response.status_code == 304 and entry is not None:
+                self.cache.save(url, None, response.headers)
+                return entry["body"]
+            if response.status_code == 200:
+                if self.cache is not None:
+                    self.cache.save(url, response.text, response.headers)
+                return response.text
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                break
+
+            # Задержка из заголовка Retry-After, иначе экспоненциальная
+            retry_after = response.headers.get("Retry-After", "")
+            delay = (
+                float(retry_after)
+                if retry_after.isdigit()
+                else self.backoff * 2**attempt
+            )
+            time.sleep(delay)
+
+        raise ConnectionError("Ошибка парсинга. Попробуйте немного позже")
+
+    def close(self) -> None:
+        """
+        Закрытие сессии
+        """
+        self.session.close()
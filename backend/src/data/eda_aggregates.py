@@ -0,0 +1,133 @@
+"""
+Программа вычисления агрегатов для графиков EDA: распределение классов,
+статистики бокплотов и сетки оценок плотности по классам
+Версия 1.0
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .get_dataset import EDA_FEATURES
+
+# Количество интервалов биннинга для оценки плотности
+KDE_BINS = 2048
+# Ширина сглаживания в интервалах ширины ядра (как cut=3 в seaborn)
+KDE_CUT = 3
+
+
+def get_class_balance(target: pd.Series) -> Dict[str, float]:
+    """
+    Доля отзывов каждого класса
+    :param target: метки классов
+    :return: словарь "класс - доля в процентах"
+    """
+    balance = target.value_counts(normalize=True).mul(100).sort_index()
+
+    return {str(label): round(float(share), 2) for label, share in balance.items()}
+
+
+def get_box_stats(values: np.ndarray, max_fliers: int = 100) -> Optional[dict]:
+    """
+    Статистики бокплота: квартили, усы по правилу 1.5 IQR и выбросы;
+    пропуски (средние длины пустых после очистки отзывов) не учитываются
+    :param values: значения признака
+    :param max_fliers: максимальное количество передаваемых выбросов
+    :return: словарь статистик в формате matplotlib bxp; None - нет значений
+    """
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    whislo, whishi = inside.min(), inside.max()
+
+    # Выбросы прореживаются равномерно, чтобы объем ответа не зависел от корпуса
+    fliers = np.sort(values[(values < whislo) | (values > whishi)])
+    if len(fliers) > max_fliers:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, max_fliers).astype(int)]
+
+    return {
+        "q1": float(q1),
+        "med": float(median),
+        "q3": float(q3),
+        "whislo": float(whislo),
+        "whishi": float(whishi),
+        "fliers": fliers.tolist(),
+        "n": int(len(values)),
+    }
+
+
+def get_kde_grid(values: np.ndarray, grid_size: int = 200) -> dict:
+    """
+    Оценка плотности гауссовым ядром на равномерной сетке; ширина ядра по
+    правилу Скотта, значения предварительно группируются в интервалы, поэтому
+    время вычисления не зависит от размера корпуса
+    :param values: значения признака
+    :param grid_size: количество точек сетки
+    :return: словарь с точками сетки x и значениями плотности y
+    """
+    values = values[np.isfinite(values)]
+    std = values.std(ddof=1) if len(values) > 1 else 0.0
+    if std == 0:
+        return {"x": [], "y": []}
+
+    bandwidth = std * len(values) ** (-1 / 5)
+    low = values.min() - KDE_CUT * bandwidth
+    high = values.max() + KDE_CUT * bandwidth
+
+    counts, edges = np.histogram(values, bins=KDE_BINS, range=(low, high))
+    step = edges[1] - edges[0]
+    centers = edges[:-1] + step / 2
+
+    # Свертка гистограммы с дискретизированным ядром
+    half_width = min(int(np.ceil(KDE_CUT * bandwidth / step)), KDE_BINS - 1)
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    density = np.convolve(counts, kernel, mode="same")
+    density /= density.sum() * step
+
+    grid = np.linspace(low, high, grid_size)
+
+    return {
+        "x": np.round(grid, 4).tolist(),
+        "y": np.round(np.interp(grid, centers, density), 6).tolist(),
+    }
+
+
+def compute_eda_aggregates(
+    data: pd.DataFrame, grid_size: int = 200, max_fliers: int = 100
+) -> dict:
+    """
+    Агрегаты для всех графиков EDA в разрезе целевой переменной
+    :param data: датафрейм с характеристиками для EDA
+    :param grid_size: количество точек сетки оценки плотности
+    :param max_fliers: максимальное количество выбросов на бокплот
+    :return: словарь агрегатов
+    """
+    groups = {
+        str(label): group for label, group in data.groupby("target", sort=True)
+    }
+
+    features = {}
+    for feature in EDA_FEATURES:
+        features[feature] = {
+            "box": {
+                label: get_box_stats(group[feature].to_numpy(float), max_fliers)
+                for label, group in groups.items()
+            },
+            "kde": {
+                label: get_kde_grid(group[feature].to_numpy(float), grid_size)
+                for label, group in groups.items()
+            },
+        }
+
+    return {
+        "n_rows": int(len(data)),
+        "class_balance": get_class_balance(data.target),
+        "features": features,
+    }
@@ -0,0 +1,152 @@
+"""
+Программа хранения вычисленных характеристик для EDA на диске
+Версия 1.0
+"""
+
+import glob
+import hashlib
+import io
+import json
+import os
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+# Форматы ответа с характеристиками для EDA: тип содержимого ответа
+COLUMNAR_FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+# Вычисленные отпечатки: путь -> (размер, время изменения, отпечаток)
+fingerprints = {}
+
+
+def get_file_fingerprint(path: str) -> str:
+    """
+    Отпечаток файла по размеру, времени изменения и хэшу содержимого;
+    содержимое перехэшируется, только если изменились размер или время изменения
+    :param path: путь к файлу
+    :return: отпечаток
+    """
+    stat = os.stat(path)
+    cached = fingerprints.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+
+    digest = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+
+    fingerprint = digest.hexdigest()[:16]
+    fingerprints[path] = (stat.st_size, stat.st_mtime_ns, fingerprint)
+
+    return fingerprint
+
+
+def get_artifact_path(cache_dir: str, fingerprint: str, suffix: str = "parquet") -> str:
+    """
+    Путь к артефакту EDA для данного отпечатка датасета
+    :param cache_dir: директория кэша
+    :param fingerprint: отпечаток датасета
+    :param suffix: расширение артефакта
+    :return: путь к файлу
+    """
+    return os.path.join(cache_dir, f"eda_{fingerprint}.{suffix}")
+
+
+def load_eda_artifact(cache_dir: str, fingerprint: str) -> Optional[pd.DataFrame]:
+    """
+    Загрузка сохраненных характеристик для EDA
+    :param cache_dir: директория кэша
+    :param fingerprint: отпечаток датасета
+    :return: dataframe или None, если артефакт отсутствует
+    """
+    path = get_artifact_path(cache_dir, fingerprint)
+    if not os.path.exists(path):
+        return None
+
+    return pd.read_parquet(path)
+
+
+def save_eda_artifact(cache_dir: str, fingerprint: str, data: pd.DataFrame) -> None:
+    """
+    Сохранение характеристик для EDA в колоночном формате; артефакты,
+    вычисленные для предыдущих версий датасета, удаляются
+    :param cache_dir: директория кэша
+    :param fingerprint: отпечаток датасета
+    :param data: dataframe с характеристиками
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(cache_dir, "eda_*")):
+        if not os.path.basename(path).startswith(f"eda_{fingerprint}."):
+            os.remove(path)
+
+    path = get_artifact_path(cache_dir, fingerprint)
+    data.to_parquet(f"{path}.tmp", index=False)
+    os.replace(f"{path}.tmp", path)
+
+
+def select_eda_columns(
+    data: pd.DataFrame, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Выбор передаваемых столбцов характеристик для EDA
+    :param data: dataframe с характеристиками
+    :param columns: передаваемые столбцы; None - все столбцы
+    :return: dataframe с выбранными столбцами
+    """
+    if not columns:
+        return data
+
+    unknown = sorted(set(columns) - set(data.columns))
+    if unknown:
+        raise ValueError(f"Неизвестные столбцы: {', '.join(unknown)}")
+
+    return data[columns]
+
+
+def serialize_eda_data(
+    data: pd.DataFrame,
+    words: list,
+    count: list,
+    fmt: str = "parquet",
+    columns: Optional[List[str]] = None,
+) -> bytes:
+    """
+    Сериализация характеристик для EDA в сжатый колоночный формат;
+    топ слов передается в метаданных схемы
+    :param data: dataframe с характеристиками
+    :param words: список топ слов
+    :param count: количество употребления слов в корпусе
+    :param fmt: формат (parquet/arrow)
+    :param columns: передаваемые столбцы; None - все столбцы
+    :return: содержимое ответа
+    """
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+
+    data = select_eda_columns(data, columns)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {
+            **(table.schema.metadata or {}),
+            b"eda": json.dumps({"words": words, "count": count}).encode("utf-8"),
+        }
+    )
+
+    buffer = io.BytesIO()
+    if fmt == "parquet":
+        pq.write_table(table, buffer, compression="zstd")
+    else:
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        with pa.ipc.new_stream(buffer, table.schema, options=options) as writer:
+            writer.write_table(table)
+
+    return buffer.getvalue()
@@ -3,13 +3,25 @@
 Версия: 1.0
 """
 
-from typing import Text
-from functools import lru_cache
+from itertools import chain
+from typing import List, Text
 import pandas as pd
 import numpy as np
 from rusenttokenize import ru_sent_tokenize
 
-from ..tokenize.text_processing import clean_text
+from ..tokenize.text_processing import clean_texts, map_in_parts
+from .eda_cache import get_file_fingerprint, load_eda_artifact, save_eda_artifact
+
+# Характеристики отзывов для EDA:
+# количество слов, количество предложений, длина отзыва в символах,
+# средняя длина слов, средняя длина предложений
+EDA_FEATURES = [
+    "Words_count",
+    "Sentences_count",
+    "Review_length",
+    "Mean_word_length",
+    "Mean_sentence_length",
+]
 
 
 def get_dataset(path: Text) -> pd.DataFrame:
@@ -23,31 +35,59 @@ def get_dataset(path: Text) -> pd.DataFrame:
     return data.drop_duplicates().reset_index(drop=True)
 
 
-@lru_cache(maxsize=None)
-def get_data_for_eda(dataset_path: str) -> pd.DataFrame:
+def get_review_features(review: str) -> tuple:
+    """
+    Вычисление характеристик отзыва для EDA за один проход по тексту
+    :param review: очищенный текст отзыва
+    :return: количество слов, количество предложений, длина отзыва,
+    средняя длина слов, средняя длина предложений
+    """
+    words = review.split()
+    sentences = ru_sent_tokenize(review)
+
+    return (
+        len(words),
+        len(sentences),
+        len(review),
+        np.mean([len(t) for t in words]),
+        np.mean([len(sent) for sent in sentences]),
+    )
+
+
+def get_reviews_features(reviews: List[str]) -> List[tuple]:
     """
-    Загрузка датасета из файла и вычисление статистик для EDA-анализа
+    Вычисление характеристик для части отзывов
+    :param reviews: очищенные тексты отзывов
+    :return: характеристики отзывов
+    """
+    return [get_review_features(review) for review in reviews]
+
+
+def get_data_for_eda(dataset_path: str, cache_dir: str = None) -> pd.DataFrame:
+    """
+    Загрузка датасета из файла и вычисление статистик для EDA-анализа;
+    результат сохраняется на диск и пересчитывается только при изменении файла
     :param dataset_path: путь к файлу
+    :param cache_dir: директория для сохранения результата
     :return data: dataframe
     """
+    if cache_dir:
+        fingerprint = get_file_fingerprint(dataset_path)
+        data = load_eda_artifact(cache_dir, fingerprint)
+        if data is not None:
+            return data
 
     data = pd.read_csv(dataset_path)
-    data["reviewText"] = data.reviewText.transform(lambda x: clean_text(x))
+    data["reviewText"] = clean_texts(data.reviewText)
+    reviews = data.reviewText.tolist()
 
-    # Количество слов
-    data["Words_count"] = data.reviewText.apply(lambda x: len(x.split()))
+    # Большие датасеты обрабатываются в общем пуле процессов
+    features = chain.from_iterable(map_in_parts(get_reviews_features, reviews))
 
-    # Количество отзывов
-    data["Sentences_count"] = data.reviewText.apply(lambda x: len(ru_sent_tokenize(x)))
-    # Длина отзывов, выраженная количеством символов
-    data["Review_length"] = data.reviewText.str.len()
+    features = pd.DataFrame(list(features), columns=EDA_FEATURES, index=data.index)
+    data = pd.concat([data, features], axis=1)
+
+    if cache_dir:
+        save_eda_artifact(cache_dir, fingerprint, data)
 
-    # Средняя длина слов
-    data["Mean_word_length"] = data.reviewText.apply(
-        lambda x: np.mean([len(t) for t in x.split()])
-    )
-    # Средняя длина предложений
-    data["Mean_sentence_length"] = data.reviewText.apply(
-        lambda rev: np.mean([len(sent) for sent in ru_sent_tokenize(rev)])
-    )
     return data
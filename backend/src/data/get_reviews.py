@@ -4,17 +4,24 @@
 """
 
 import json
+import os
 import re
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
 from tqdm.auto import tqdm
-import time
-import numpy as np
 import yaml
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from .checkpoint import CrawlCheckpoint
+from .crawler import Crawler, ResponseCache
+from .parsing import parse_review_links, parse_review_text
+from ..tokenize.text_processing import ProcessPool, clean_texts
+from ..tokenize.freq_index import update_index_file
+
+
+# Пул процессов разбора страниц, общий для всех запусков парсинга в процессе
+parse_pool = ProcessPool()
 
 
 def get_request_params(url: str) -> tuple:
@@ -42,25 +49,46 @@ def get_request_params(url: str) -> tuple:
     return base_url, num_page
 
 
-def get_session() -> requests.session:
+def get_reviews(
+    config_path: str, url: str, page_count: int = 2, progress: Callable = None
+) -> dict:
     """
-    Создание сессии
-    :return session
+    Получение отзывов с сайта отзовик с сохранением в файл
+    :param config_path: путь к конфигурационному файлу
+    :param url: URL-запрос
+    :param page_count: количество страниц для парсинга
+    :param progress: функция записи прогресса (количество страниц и отзывов)
+    :return: путь к файлу отзывов и количество новых отзывов
     """
-    session = requests.Session()
-    retry = Retry(connect=3, backoff_factor=0.5)
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    return session
+    with open(config_path) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+
+    reviews = 0
+    for pages_scraped, pages_total, page_data in iter_reviews(
+        config_path, url, page_count
+    ):
+        reviews += len(page_data)
+        if progress is not None:
+            progress(
+                pages_scraped=pages_scraped, page_count=pages_total, reviews=reviews
+            )
+
+    return {"path": config["preprocessing"]["scrape_path"], "reviews": reviews}
 
 
-def get_reviews(config_path: str, url: str, page_count: int = 2) -> None:
+def iter_reviews(
+    config_path: str, url: str, page_count: int = 2
+) -> Iterator[Tuple[int, int, List[str]]]:
     """
-    Получение отзывов с сайта отзовик
+    Получение отзывов с сайта отзовик по мере обработки страниц списка:
+    страницы списка и страницы отзывов загружаются в несколько потоков
+    с ограничением частоты запросов. Отзывы дописываются в файл после каждой
+    страницы списка, поэтому повторный запуск продолжает с места остановки
+    и пропускает собранные отзывы
     :param config_path: путь к конфигурационному файлу
     :param url: URL-запрос
     :param page_count: количество страниц для парсинга
+    :return: номер обработанной страницы, количество страниц, новые отзывы страницы
     """
 
     with open(config_path) as file:
@@ -68,6 +96,7 @@ def get_reviews(config_path: str, url: str, page_count: int = 2) -> None:
     preprocessing_params = config["preprocessing"]
 
     data_path = preprocessing_params["scrape_path"]
+    cache_ttl = preprocessing_params["scrape_cache_ttl"]
 
     with open(preprocessing_params["connection_path"], "r") as json_file:
         params = json.load(json_file)
@@ -76,42 +105,99 @@ def get_reviews(config_path: str, url: str, page_count: int = 2) -> None:
         headers = params["headers"]
         HOST = params["HOST"]
 
-    data = []
+    crawler = Crawler(
+        headers=headers,
+        cookies=cookies,
+        concurrency=preprocessing_params["scrape_concurrency"],
+        rate=preprocessing_params["scrape_rate"],
+        burst=preprocessing_params["scrape_burst"],
+        max_retries=preprocessing_params["scrape_max_retries"],
+        backoff=preprocessing_params["scrape_backoff"],
+        timeout=preprocessing_params["scrape_timeout"],
+        cache=ResponseCache(preprocessing_params["scrape_cache_dir"], ttl=cache_ttl),
+    )
+    checkpoint = CrawlCheckpoint(preprocessing_params["scrape_checkpoint_path"])
+
+    page_count = int(page_count)
     base_url, page_num = get_request_params(url)
+    page_urls = [f"{base_url}/{int(page_num) + i}/" for i in range(page_count)]
 
-    for i in tqdm(range(int(page_count))):
-
-        url = f"{base_url}/{int(page_num) + i}/"
-        session = get_session()
-        response = session.get(url, headers=headers, cookies=cookies)
-        if response.status_code != 200:
-            raise ConnectionError('Ошибка парсинга. Попробуйте немного позже')
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        href_list = soup.find_all("a", class_="review-btn review-read-link")
-
-        for j, link in enumerate(href_list):
-
-            pause = np.random.uniform(0, 1)
-            time.sleep(pause)
+    # Недавно обработанные страницы списка не загружаются повторно
+    page_urls = [
+        page_url
+        for page_url in page_urls
+        if not checkpoint.is_page_visited(page_url, max_age=cache_ttl)
+    ]
 
-            # Проход циклом по всем ссылкам, полученным со страницы
-            href = str(HOST + link["href"])
-            response = session.get(href, cookies=cookies, headers=headers)
-            if response.status_code != 200:
-                raise ConnectionError('Ошибка парсинга. Попробуйте немного позже')
-
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # Получение текста отзыва
-            try:
-                review_text = soup.find(
-                    "div", class_="review-body description"
-                ).getText()
-                data.append(review_text)
-
-            except AttributeError:
-                continue
-
-    df = pd.Series(data, name="reviewText")
-    df.to_csv(data_path, index=False)
+    data = []
+    executor = ThreadPoolExecutor(max_workers=crawler.concurrency)
+    parse_workers = preprocessing_params["scrape_parse_workers"]
+
+    def fetch_and_parse(
+        page_url: str, max_age: Optional[float], parse: Callable, *args
+    ) -> Future:
+        # Поток загрузки только получает страницу и передает ее на разбор
+        # в пул процессов, не дожидаясь результата
+        return parse_pool.submit(
+            parse, crawler.fetch(page_url, max_age), *args, max_workers=parse_workers
+        )
+
+    try:
+        # Сначала загружаются и разбираются все страницы списка, затем новые
+        # отзывы; результаты собираются в исходном порядке страниц и ссылок
+        pages = [
+            future.result().result()
+            for future in [
+                executor.submit(
+                    fetch_and_parse, page_url, None, parse_review_links, HOST
+                )
+                for page_url in page_urls
+            ]
+        ]
+
+        submitted = set()
+        review_futures = []
+        for hrefs in pages:
+            seen = submitted | checkpoint.get_seen(hrefs)
+            new_hrefs = [href for href in dict.fromkeys(hrefs) if href not in seen]
+            submitted.update(new_hrefs)
+            # Страницы отзывов не меняются, запись кэша не устаревает
+            review_futures.append(
+                [
+                    (
+                        href,
+                        executor.submit(
+                            fetch_and_parse, href, float("inf"), parse_review_text
+                        ),
+                    )
+                    for href in new_hrefs
+                ]
+            )
+
+        for i, (page_url, futures) in enumerate(zip(page_urls, tqdm(review_futures))):
+            page_data = []
+            for href, future in futures:
+                review_text = future.result().result()
+                if review_text is not None:
+                    page_data.append(review_text)
+
+            pd.Series(page_data, name="reviewText").to_csv(
+                data_path,
+                mode="a",
+                header=not os.path.exists(data_path),
+                index=False,
+            )
+            checkpoint.mark_page(page_url, [href for href, _ in futures])
+            data.extend(page_data)
+
+            yield i + 1, len(page_urls), page_data
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        crawler.close()
+        checkpoint.close()
+
+        # Дополнение частотного словаря отзывами, записанными в файл
+        update_index_file(
+            preprocessing_params["scrape_freq_index_path"],
+            clean_texts(pd.Series(data, name="reviewText", dtype=object)).tolist(),
+        )
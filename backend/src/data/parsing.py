@@ -0,0 +1,41 @@
+"""
+Программа разбора страниц сайта отзовик: из страницы строится только
+нужная часть дерева (ссылки на отзывы или текст отзыва)
+Версия 1.0
+"""
+
+from typing import List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Ограничения разбора: на странице списка нужны только ссылки на отзывы,
+# на странице отзыва - только блок с текстом
+REVIEW_LINKS = SoupStrainer("a", class_="review-btn review-read-link")
+REVIEW_BODY = SoupStrainer("div", class_="review-body description")
+
+
+def parse_review_links(html: str, host: str) -> List[str]:
+    """
+    Ссылки на отзывы со страницы списка отзывов
+    :param html: текст страницы
+    :param host: адрес сайта
+    :return: список ссылок
+    """
+    soup = BeautifulSoup(html, "html.parser", parse_only=REVIEW_LINKS)
+    href_list = soup.find_all("a", class_="review-btn review-read-link")
+
+    return [str(host + link["href"]) for link in href_list]
+
+
+def parse_review_text(html: str) -> Optional[str]:
+    """
+    Текст отзыва со страницы отзыва
+    :param html: текст страницы
+    :return: текст отзыва или None, если его нет на странице
+    """
+    soup = BeautifulSoup(html, "html.parser", parse_only=REVIEW_BODY)
+
+    try:
+        return soup.find("div", class_="review-body description").getText()
+    except AttributeError:
+        return None
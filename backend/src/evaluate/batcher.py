@@ -0,0 +1,98 @@
+"""
+Программа динамического объединения одиночных запросов в батчи
+Версия 1.0
+"""
+
+import asyncio
+from typing import Any, Callable, List
+
+import yaml
+
+
+class MicroBatcher:
+    """
+    Очередь запросов на предсказание: запросы, пришедшие в пределах окна
+    ожидания, объединяются в один батч и обрабатываются одним проходом модели
+    """
+
+    def __init__(self, config_path: str, predict_fn: Callable[[List[str]], List[Any]]):
+        with open(config_path) as file:
+            config = yaml.load(file, Loader=yaml.FullLoader)
+        test_config = config["test"]
+
+        self.predict_fn = predict_fn
+        self.max_batch_size = test_config["batch_max_size"]
+        self.max_wait = test_config["batch_max_wait_ms"] / 1000
+        self._queue = None
+        self._worker = None
+
+    async def start(self) -> None:
+        """
+        Запуск фоновой задачи обработки очереди
+        """
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Остановка фоновой задачи обработки очереди
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def predict(self, text: str) -> Any:
+        """
+        Постановка отзыва в очередь и ожидание результата предсказания
+        :param text: текст отзыва
+        :return: результат predict_fn для данного отзыва
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+
+        return await future
+
+    async def _collect(self) -> list:
+        """
+        Сбор батча: ожидание первого запроса, затем добор запросов до
+        max_batch_size или до истечения окна ожидания
+        :return: список пар (текст, future)
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _ in batch]
+
+            # Проход модели выполняется вне event loop, чтобы не блокировать прием запросов
+            try:
+                results = await loop.run_in_executor(None, self.predict_fn, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,200 @@
+"""
+Программа кэширования предсказаний модели по очищенному тексту отзыва
+Версия 1.0
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Записи для кэша на диске накапливаются и сохраняются одной транзакцией
+# при достижении этого количества или по истечении интервала, секунды
+COMMIT_EVERY = 1000
+COMMIT_INTERVAL = 5.0
+
+
+class PredictionCache:
+    """
+    Кэш вероятностей классов: ограниченный LRU-кэш в памяти и необязательный
+    кэш на диске (SQLite), из которого при превышении max_db_rows удаляются
+    самые старые записи. Ключ - хэш очищенного текста и версии модели
+    """
+
+    def __init__(
+        self,
+        max_size: int = 100000,
+        db_path: Optional[str] = None,
+        max_db_rows: int = 1000000,
+    ):
+        self.max_size = max_size
+        self.max_db_rows = max_db_rows
+        self.version = ""
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._pending = []
+        self._flushed = time.monotonic()
+
+    @property
+    def _db(self) -> Optional[sqlite3.Connection]:
+        """
+        Соединение с кэшем на диске; открывается отдельно в каждом процессе,
+        так как соединение SQLite нельзя использовать после fork
+        """
+        if not self.db_path:
+            return None
+
+        if self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # Журнал WAL: фиксация транзакции без синхронизации файла базы
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, version TEXT, probs TEXT)"
+            )
+            self._conn.commit()
+            self._pid = os.getpid()
+            self._pending = []
+
+        return self._conn
+
+    def set_version(self, version: str) -> None:
+        """
+        Установка версии модели; при смене версии все записи кэша сбрасываются
+        :param version: версия модели
+        """
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            self._memory.clear()
+            self._pending.clear()
+
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions WHERE version != ?", (version,))
+                self._db.commit()
+
+    def make_key(self, text: str) -> str:
+        """
+        Ключ кэша для очищенного текста отзыва
+        :param text: очищенный текст отзыва
+        :return: ключ
+        """
+        return hashlib.sha1(f"{self.version}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[int, list]:
+        """
+        Поиск предсказаний в кэше
+        :param texts: очищенные тексты отзывов
+        :return: словарь {позиция текста: вероятности классов} для найденных записей
+        """
+        found = {}
+        missing = {}
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self.make_key(text)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[i] = self._memory[key]
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            # Поиск в кэше на диске того, чего нет в памяти
+            if self._db is not None and missing:
+                keys = list(missing)
+                for pos in range(0, len(keys), 500):
+                    part = keys[pos : pos + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, probs FROM predictions WHERE key IN "
+                        f"({','.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+                    for key, probs in rows:
+                        probs = json.loads(probs)
+                        self._put_memory(key, probs)
+                        for i in missing[key]:
+                            found[i] = probs
+
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+
+        return found
+
+    def put_many(self, texts: List[str], probs: List[list]) -> None:
+        """
+        Запись предсказаний в кэш
+        :param texts: очищенные тексты отзывов
+        :param probs: вероятности классов для каждого текста
+        """
+        with self._lock:
+            rows = []
+            for text, row in zip(texts, probs):
+                key = self.make_key(text)
+                self._put_memory(key, row)
+                rows.append((key, self.version, json.dumps(row)))
+
+            if self._db is not None and rows:
+                self._pending.extend(rows)
+                if (
+                    len(self._pending) >= COMMIT_EVERY
+                    or time.monotonic() - self._flushed >= COMMIT_INTERVAL
+                ):
+                    self._flush()
+
+    def flush(self) -> None:
+        """
+        Сохранение накопленных записей в кэш на диске
+        """
+        with self._lock:
+            if self._db is not None:
+                self._flush()
+
+    def _flush(self) -> None:
+        self._flushed = time.monotonic()
+        if not self._pending:
+            return
+
+        self._db.executemany(
+            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)", self._pending
+        )
+        self._pending = []
+        # Новые записи получают наибольший rowid: удаляются самые старые записи
+        self._db.execute(
+            "DELETE FROM predictions WHERE rowid <= "
+            "(SELECT MAX(rowid) FROM predictions) - ?",
+            (self.max_db_rows,),
+        )
+        self._db.commit()
+
+    def _put_memory(self, key: str, probs: list) -> None:
+        self._memory[key] = probs
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Статистика обращений к кэшу
+        :return: словарь с количеством попаданий, промахов и записей в памяти
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "memory_size": len(self._memory),
+            }
@@ -3,16 +3,22 @@
 Версия: 1.0
 """
 
-import yaml
+import json
 import numpy as np
-from transformers import Trainer, TextClassificationPipeline, BertTokenizer
+import pandas as pd
 from collections import Counter
-from typing import Tuple
+from typing import Iterator, List, Tuple, Union
 
 from ..data.get_dataset import get_dataset
-from ..pipelines.get_embeddings import get_bert_embeddings
+from ..data.get_reviews import iter_reviews
 from ..transform.transform import pipeline_preprocess
-from ..train.train import model_load
+from ..tokenize.text_processing import clean_text
+from ..tokenize.freq_index import ShardWriter
+from .registry import registry
+
+# Частотный словарь загруженных отзывов дополняется в фоновом потоке,
+# чтобы запись на диск не задерживала ответ с предсказаниями
+upload_index_writer = ShardWriter()
 
 
 def pipeline_evaluate(
@@ -25,29 +31,20 @@ def pipeline_evaluate(
     :return predictions: предсказания
     :return stats: словарь со статистикой предсказаний
     """
-    with open(config_path) as file:
-        config = yaml.load(file, Loader=yaml.FullLoader)
-
-    train_config = config["train"]
-    test_config = config["test"]
-
     # Если указан пусть к файлу
     if data_path:
         test_data = get_dataset(data_path)
 
     # Предобработка тестового датасета
     test_data = pipeline_preprocess(test_data, flg2eval=True)
-    test_dataset = get_bert_embeddings(test_data, train_config)
-    # Загрузка модели Bert
-    model = model_load(test_config)
-    test_trainer = Trainer(model)
 
     # Выполнение предсказаний
-    raw_pred, _, _ = test_trainer.predict(test_dataset)
-    y_pred = np.argmax(raw_pred, axis=1)
+    probs = predict_proba(config_path, test_data.tolist())
+    y_pred = np.argmax(probs, axis=1)
 
     predictions = y_pred.tolist()
     stats = get_sentiment_stats(predictions)
+    index_uploaded_reviews(config_path, test_data.tolist(), predictions)
 
     return predictions, stats
 
@@ -61,32 +58,197 @@ def evaluate_from_input(config_path: str, text: str) -> Tuple[dict, str]:
     :return predicted_label: предсказанный класс
     """
 
-    with open(config_path) as file:
-        config = yaml.load(file, Loader=yaml.FullLoader)
+    probabilities, predicted_label = evaluate_batch(config_path, [text])[0]
+
+    return probabilities, predicted_label
+
+
+def predict_proba(config_path: str, texts: List[str]) -> np.ndarray:
+    """
+    Вычисление вероятностей классов для списка очищенных отзывов; модель
+    вызывается только для отзывов, отсутствующих в кэше предсказаний
+    :param config_path: пусть к конфигурационному файлу
+    :param texts: очищенные тексты отзывов
+    :return: матрица вероятностей [len(texts), число классов]
+    """
+    # Модель и токенизатор загружаются один раз на процесс
+    engine = registry.get_engine(config_path)
+    cache = registry.cache
+
+    probs = np.empty((len(texts), engine.model.config.num_labels), dtype=np.float32)
+    found = cache.get_many(texts)
+    for i, row in found.items():
+        probs[i] = row
+
+    missing = [i for i in range(len(texts)) if i not in found]
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        missing_probs = engine.predict_proba(missing_texts)
+        probs[missing] = missing_probs
+        cache.put_many(missing_texts, missing_probs.tolist())
 
-    train_config = config["train"]
-    test_config = config["test"]
+    return probs
 
-    pipe = TextClassificationPipeline(
-        model=model_load(test_config),
-        tokenizer=BertTokenizer.from_pretrained(train_config["tokenizer_path"]),
-        return_all_scores=True,
+
+def index_uploaded_reviews(
+    config_path: str, texts: List[str], predictions: List[int]
+) -> None:
+    """
+    Постановка отзывов, загруженных для предсказания, в очередь дополнения
+    частотного словаря; метки классов - предсказания модели
+    :param config_path: пусть к конфигурационному файлу
+    :param texts: очищенные тексты отзывов
+    :param predictions: предсказанные классы
+    """
+    _, _, config = registry.get(config_path)
+    preprocessing_config = config["preprocessing"]
+
+    upload_index_writer.add(
+        preprocessing_config["upload_freq_index_dir"],
+        texts,
+        predictions,
+        compact_every=preprocessing_config["upload_freq_compact_every"],
     )
-    raw_probs = pipe(text)[0]
-    probabilities = {item["label"]: item["score"] for item in raw_probs}
-    predicted_label = max(probabilities, key=probabilities.get)
 
-    return probabilities, predicted_label
 
+def evaluate_batch(config_path: str, texts: List[str]) -> List[Tuple[dict, str]]:
+    """
+    Предсказание тональности списка отзывов за один проход модели
+    :param config_path: пусть к конфигурационному файлу
+    :param texts: тексты отзывов
+    :return: список пар (словарь с вероятностями классов, предсказанный класс)
+    """
+    model, _, _ = registry.get(config_path)
+    id2label = model.config.id2label
+
+    # Ключ кэша и вход модели - очищенный текст, как и при обучении
+    texts = [clean_text(text) for text in texts]
+
+    probs = predict_proba(config_path, texts)
+    index_uploaded_reviews(config_path, texts, np.argmax(probs, axis=1).tolist())
+
+    results = []
+    for row in probs.tolist():
+        probabilities = {id2label[i]: score for i, score in enumerate(row)}
+        predicted_label = max(probabilities, key=probabilities.get)
+        results.append((probabilities, predicted_label))
+
+    return results
 
-def get_sentiment_stats(preds: list) -> dict:
+
+def pipeline_evaluate_stream(config_path: str, data_path: str) -> Iterator[str]:
+    """
+    Потоковый пайплайн выполнения предсказаний из файла: файл читается частями
+    фиксированного размера, каждая часть очищается, токенизируется и
+    классифицируется отдельно, результаты отдаются построчно в формате NDJSON.
+    Ошибки формата файла возникают при получении первой строки результата
+    :param config_path: конфигурационный файл
+    :param data_path: путь к файлу
+    :return: строки NDJSON с предсказаниями, последняя строка - статистика
+    """
+    model, _, config = registry.get(config_path)
+    id2label = model.config.id2label
+    counter = Counter()
+    rows = 0
+    # Хэши уже обработанных строк: дубликаты удаляются во всем файле
+    seen = set()
+
+    for chunk in pd.read_csv(data_path, chunksize=config["test"]["chunk_size"]):
+        rows += len(chunk)
+        hashes = pd.util.hash_pandas_object(chunk, index=False)
+        is_new = ~hashes.duplicated() & ~hashes.isin(seen)
+        seen.update(hashes[is_new].tolist())
+        if not is_new.any():
+            continue
+
+        test_data = pipeline_preprocess(chunk[is_new], flg2eval=True)
+        probs = predict_proba(config_path, test_data.tolist())
+        y_pred = np.argmax(probs, axis=1)
+        counter.update(y_pred.tolist())
+        index_uploaded_reviews(config_path, test_data.tolist(), y_pred.tolist())
+
+        lines = []
+        for idx, pred, row in zip(test_data.index, y_pred.tolist(), probs.tolist()):
+            record = {
+                "index": int(idx),
+                "prediction": pred,
+                "probabilities": {id2label[i]: score for i, score in enumerate(row)},
+            }
+            lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        yield "".join(lines)
+
+    if not rows:
+        raise ValueError("Файл не содержит отзывов")
+
+    yield json.dumps({"stats": get_sentiment_stats(counter)}, ensure_ascii=False) + "\n"
+
+
+def pipeline_scrape_evaluate_stream(
+    config_path: str, url: str, page_count: int
+) -> Iterator[str]:
+    """
+    Потоковый пайплайн парсинга и классификации: новые отзывы каждой
+    обработанной страницы списка сразу классифицируются одним батчем,
+    результаты и текущая статистика отдаются построчно в формате NDJSON
+    :param config_path: конфигурационный файл
+    :param url: URL-запрос
+    :param page_count: количество страниц для парсинга
+    :return: строки NDJSON с предсказаниями, после каждой страницы - прогресс
+    и статистика, последняя строка - итоговая статистика
+    """
+    model, _, _ = registry.get(config_path)
+    id2label = model.config.id2label
+    counter = Counter()
+    reviews = 0
+
+    for pages_scraped, pages_total, page_data in iter_reviews(
+        config_path, url, page_count
+    ):
+        lines = []
+        if page_data:
+            texts = pipeline_preprocess(
+                pd.Series(page_data, name="reviewText", dtype=object), flg2eval=True
+            )
+            probs = predict_proba(config_path, texts.tolist())
+            y_pred = np.argmax(probs, axis=1)
+            counter.update(y_pred.tolist())
+
+            for review, pred, row in zip(page_data, y_pred.tolist(), probs.tolist()):
+                record = {
+                    "index": reviews,
+                    "review": review.strip(),
+                    "prediction": pred,
+                    "probabilities": {id2label[i]: score for i, score in enumerate(row)},
+                }
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+                reviews += 1
+
+        progress = {
+            "pages_scraped": pages_scraped,
+            "page_count": pages_total,
+            "reviews": reviews,
+        }
+        lines.append(
+            json.dumps(
+                {"progress": progress, "stats": get_sentiment_stats(counter)},
+                ensure_ascii=False,
+            )
+            + "\n"
+        )
+        yield "".join(lines)
+
+    yield json.dumps({"stats": get_sentiment_stats(counter)}, ensure_ascii=False) + "\n"
+
+
+def get_sentiment_stats(preds: Union[list, Counter]) -> dict:
     """
     Получение статистики классификации модели по данным из файла
-    :param preds: предсказания модели
+    :param preds: предсказания модели или счетчик предсказаний по классам
     :return: словарь со относительным количеством позитивных/негативных предсказаний
     """
-    counter = Counter(preds)
+    counter = preds if isinstance(preds, Counter) else Counter(preds)
+    total = sum(counter.values()) or 1
     return {
-        "Negative": f"{round(counter[0] / len(preds) * 100, 1)} %",
-        "Positive": f"{round(counter[1] / len(preds) * 100, 1)} %",
+        "Negative": f"{round(counter[0] / total * 100, 1)} %",
+        "Positive": f"{round(counter[1] / total * 100, 1)} %",
     }
@@ -0,0 +1,106 @@
+"""
+Программа выполнения предсказаний модели Bert без объекта Trainer
+с динамическим дополнением батчей, сгруппированных по длине
+Версия 1.0
+"""
+
+from typing import List
+
+import numpy as np
+import torch
+import transformers
+
+
+class InferenceEngine:
+    """
+    Выполнение предсказаний обученной модели: отзывы сортируются по количеству
+    токенов, батчи дополняются только до самого длинного отзыва в батче,
+    результаты возвращаются в исходном порядке
+    """
+
+    def __init__(
+        self,
+        model: transformers.PreTrainedModel,
+        tokenizer: transformers.PreTrainedTokenizerBase,
+        max_length: int = 512,
+        batch_size: int = 64,
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+        # Первый вызов быстрого токенизатора меняет его настройки обрезки;
+        # он выполняется здесь, до использования движка из нескольких потоков
+        self.encode([""])
+
+    def encode(self, texts: List[str]) -> List[List[int]]:
+        """
+        Токенизация без дополнения - длина каждого отзыва сохраняется
+        :param texts: тексты отзывов
+        :return: списки идентификаторов токенов
+        """
+        return self.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )["input_ids"]
+
+    def pad_batch(self, batch_ids: List[List[int]]) -> dict:
+        """
+        Дополнение батча до длины самой длинной последовательности в нем
+        :param batch_ids: списки идентификаторов токенов
+        :return: словарь тензоров input_ids, attention_mask, token_type_ids
+        """
+        length = max(len(ids) for ids in batch_ids)
+        input_ids = np.full(
+            (len(batch_ids), length), self.tokenizer.pad_token_id, dtype=np.int64
+        )
+        attention_mask = np.zeros((len(batch_ids), length), dtype=np.int64)
+
+        for row, ids in enumerate(batch_ids):
+            input_ids[row, : len(ids)] = ids
+            attention_mask[row, : len(ids)] = 1
+
+        return {
+            "input_ids": torch.from_numpy(input_ids),
+            "attention_mask": torch.from_numpy(attention_mask),
+            "token_type_ids": torch.zeros_like(torch.from_numpy(input_ids)),
+        }
+
+    def predict_logits(self, texts: List[str]) -> np.ndarray:
+        """
+        Получение логитов модели для списка отзывов
+        :param texts: тексты отзывов
+        :return: матрица логитов [len(texts), число классов]
+        """
+        logits = np.empty((len(texts), self.model.config.num_labels), dtype=np.float32)
+        if not texts:
+            return logits
+
+        input_ids = self.encode(texts)
+
+        # Порядок отзывов по возрастанию длины
+        order = np.argsort([len(ids) for ids in input_ids], kind="stable")
+
+        with torch.inference_mode():
+            for pos in range(0, len(texts), self.batch_size):
+                idx = order[pos : pos + self.batch_size]
+                batch = self.pad_batch([input_ids[i] for i in idx])
+                # Запись результатов на исходные позиции отзывов
+                logits[idx] = self.model(**batch).logits.float().numpy()
+
+        return logits
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """
+        Получение вероятностей классов для списка отзывов
+        :param texts: тексты отзывов
+        :return: матрица вероятностей [len(texts), число классов]
+        """
+        logits = torch.from_numpy(self.predict_logits(texts))
+
+        return torch.softmax(logits, dim=-1).numpy()
@@ -0,0 +1,116 @@
+"""
+Программа выполнения предсказаний модели Bert через ONNX Runtime
+Версия 1.0
+"""
+
+import json
+import os
+import shutil
+from typing import List
+
+import numpy as np
+import onnxruntime as ort
+import torch
+from transformers import AutoConfig, BertTokenizerFast
+from transformers.modeling_outputs import SequenceClassifierOutput
+
+from ..train.train import model_load, export_onnx
+from .inference import InferenceEngine
+
+
+class OnnxModel:
+    """
+    Обертка над сессией ONNX Runtime с интерфейсом вызова модели transformers
+    """
+
+    def __init__(self, test_config: dict):
+        self.config = AutoConfig.from_pretrained(test_config["model_path"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            test_config["onnx_path"],
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = [item.name for item in self.session.get_inputs()]
+
+    def __call__(self, **inputs) -> SequenceClassifierOutput:
+        feed = {name: inputs[name].numpy() for name in self.input_names}
+        logits = self.session.run(["logits"], feed)[0]
+
+        return SequenceClassifierOutput(logits=torch.from_numpy(logits))
+
+
+def check_onnx_parity(config: dict, texts: List[str]) -> float:
+    """
+    Сравнение логитов ONNX-модели и модели PyTorch
+    :param config: конфигурационный словарь
+    :param texts: тексты отзывов для проверки
+    :return: максимальное абсолютное расхождение логитов
+    """
+    train_config = config["train"]
+    test_config = config["test"]
+
+    tokenizer = BertTokenizerFast.from_pretrained(train_config["tokenizer_path"])
+    torch_model = model_load(test_config)
+    torch_model.eval()
+
+    torch_logits = InferenceEngine(
+        torch_model, tokenizer, max_length=train_config["max_length"]
+    ).predict_logits(texts)
+    onnx_logits = InferenceEngine(
+        OnnxModel(test_config), tokenizer, max_length=train_config["max_length"]
+    ).predict_logits(texts)
+
+    return float(np.abs(torch_logits - onnx_logits).max(initial=0.0))
+
+
+def save_onnx_model(config: dict, texts: List[str]) -> dict:
+    """
+    Экспорт сохраненной модели в ONNX со сверкой логитов до замены файла:
+    при расхождении больше onnx_parity_atol ONNX-модель удаляется (сервис
+    использует PyTorch), результат сверки сохраняется в отчет
+    :param config: конфигурационный словарь
+    :param texts: тексты отзывов для проверки
+    :return: отчет о сверке
+    """
+    test_config = config["test"]
+    onnx_path = test_config["onnx_path"]
+
+    # Экспорт во временную папку: вместе с моделью могут сохраняться
+    # внешние файлы весов, которые ищутся по имени рядом с ней
+    export_dir = os.path.join(os.path.dirname(onnx_path), ".onnx_export")
+    shutil.rmtree(export_dir, ignore_errors=True)
+    os.makedirs(export_dir)
+    tmp_config = {
+        **test_config,
+        "onnx_path": os.path.join(export_dir, os.path.basename(onnx_path)),
+    }
+
+    export_onnx(tmp_config)
+    max_diff = check_onnx_parity({**config, "test": tmp_config}, texts)
+    report = {
+        "max_abs_diff": max_diff,
+        "atol": test_config["onnx_parity_atol"],
+        "passed": max_diff <= test_config["onnx_parity_atol"],
+    }
+
+    if report["passed"]:
+        for name in os.listdir(export_dir):
+            os.replace(
+                os.path.join(export_dir, name),
+                os.path.join(os.path.dirname(onnx_path), name),
+            )
+    else:
+        # Прежняя ONNX-модель относится к предыдущей версии модели
+        for path in [onnx_path, f"{onnx_path}.data"]:
+            if os.path.exists(path):
+                os.remove(path)
+    shutil.rmtree(export_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(test_config["onnx_parity_report_path"]), exist_ok=True)
+    with open(test_config["onnx_parity_report_path"], "w") as file:
+        json.dump(report, file)
+
+    return report
@@ -0,0 +1,184 @@
+"""
+Программа хранения обученной модели и токенизатора, загружаемых один раз на процесс
+Версия 1.0
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Tuple
+
+import yaml
+import transformers
+from transformers import BertTokenizerFast
+
+from ..train.train import model_load
+from ..train.quantize import load_quantized_model
+from .inference import InferenceEngine
+from .cache import PredictionCache
+
+
+def get_model_version(test_config: dict) -> str:
+    """
+    Версия модели по размеру и времени изменения файлов сохраненных артефактов
+    :param test_config: конфигурационный файл
+    :return: версия модели
+    """
+    paths = []
+    for root, _, files in os.walk(test_config["model_path"]):
+        paths.extend(os.path.join(root, name) for name in files)
+    for key in ["onnx_path", "quantized_model_path"]:
+        if os.path.isfile(test_config[key]):
+            paths.append(test_config[key])
+
+    state = [test_config["backend"]]
+    for path in sorted(set(paths)):
+        stat = os.stat(path)
+        state.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+
+    return hashlib.sha1("|".join(state).encode("utf-8")).hexdigest()[:16]
+
+
+class ModelRegistry:
+    """
+    Реестр модели Bert и токенизатора, общий для всех путей выполнения предсказаний
+    """
+
+    def __init__(self):
+        self.config = None
+        self.model = None
+        self.tokenizer = None
+        self.engine = None
+        self.cache = None
+        self.version = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        # Загрузка и проверка версии модели выполняются одним потоком
+        self._reload_lock = threading.RLock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def load(self, config_path: str) -> bool:
+        """
+        Загрузка (или перезагрузка) обученной модели и токенизатора
+        :param config_path: путь к конфигурационному файлу
+        :return: True, если модель загружена, False - если модель еще не обучена
+        """
+        with self._reload_lock:
+            return self._load(config_path)
+
+    def _load(self, config_path: str) -> bool:
+        with open(config_path) as file:
+            config = yaml.load(file, Loader=yaml.FullLoader)
+
+        train_config = config["train"]
+        test_config = config["test"]
+
+        if not os.path.exists(test_config["model_path"]):
+            return False
+
+        # ONNX-модель отсутствует, если не прошла сверку с PyTorch после обучения
+        if test_config["backend"] == "onnx" and os.path.exists(
+            test_config["onnx_path"]
+        ):
+            # onnxruntime нужен только при выборе этого варианта выполнения
+            from .onnx_backend import OnnxModel
+
+            model = OnnxModel(test_config)
+        # Квантизованная модель создается только при обучении с train.quantize
+        elif test_config["backend"] == "quantized" and os.path.exists(
+            test_config["quantized_model_path"]
+        ):
+            model = load_quantized_model(test_config)
+        else:
+            model = model_load(test_config)
+            model.eval()
+        tokenizer = BertTokenizerFast.from_pretrained(train_config["tokenizer_path"])
+        engine = InferenceEngine(
+            model,
+            tokenizer,
+            max_length=train_config["max_length"],
+            batch_size=test_config["inference_batch_size"],
+        )
+        version = get_model_version(test_config)
+
+        # Подмена объектов целиком, чтобы параллельные запросы не увидели
+        # модель от одной версии и токенизатор от другой
+        with self._lock:
+            self.config = config
+            self.model = model
+            self.tokenizer = tokenizer
+            self.engine = engine
+            self.version = version
+
+            # Кэш предсказаний сбрасывается при смене версии модели
+            if self.cache is None:
+                self.cache = PredictionCache(
+                    max_size=test_config["cache_size"],
+                    db_path=test_config["cache_db_path"],
+                    max_db_rows=test_config["cache_db_max_rows"],
+                )
+            self.cache.set_version(version)
+
+        return True
+
+    def get(
+        self, config_path: str
+    ) -> Tuple[transformers.BertForSequenceClassification, BertTokenizerFast, dict]:
+        """
+        Получение модели, токенизатора и конфигурации; при первом обращении
+        выполняется загрузка
+        :param config_path: путь к конфигурационному файлу
+        :return model: обученная модель классификации Bert
+        :return tokenizer: токенизатор
+        :return config: конфигурационный словарь
+        """
+        if not self.is_loaded:
+            with self._reload_lock:
+                if not self.is_loaded and not self._load(config_path):
+                    raise FileNotFoundError(
+                        "Модель не найдена. Сначала обучите модель"
+                    )
+        self.refresh(config_path)
+
+        with self._lock:
+            return self.model, self.tokenizer, self.config
+
+    def refresh(self, config_path: str) -> None:
+        """
+        Перезагрузка модели, если ее файлы изменились (например, после обучения
+        в другом процессе); проверка выполняется не чаще reload_check_interval.
+        Если модель уже проверяет или загружает другой поток, запрос использует
+        текущую модель
+        :param config_path: путь к конфигурационному файлу
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            test_config = self.config["test"]
+            now = time.monotonic()
+            if now - self._checked < test_config["reload_check_interval"]:
+                return
+            self._checked = now
+
+            if get_model_version(test_config) != self.version:
+                self._load(config_path)
+        finally:
+            self._reload_lock.release()
+
+    def get_engine(self, config_path: str) -> InferenceEngine:
+        """
+        Получение движка выполнения предсказаний для загруженной модели
+        :param config_path: путь к конфигурационному файлу
+        :return: InferenceEngine
+        """
+        self.get(config_path)
+
+        with self._lock:
+            return self.engine
+
+
+registry = ModelRegistry()
@@ -0,0 +1,221 @@
+"""
+Программа выполнения длительных задач (обучение, парсинг) в фоне
+с отслеживанием статуса и прогресса
+Версия 1.0
+"""
+
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import yaml
+from transformers import TrainerCallback
+
+# Поля задачи, хранящиеся в формате JSON
+JSON_FIELDS = ("progress", "result")
+
+
+class JobManager:
+    """
+    Очередь фоновых задач. Состояние задач хранится в SQLite, общей для всех
+    рабочих процессов сервиса: статус доступен из любого процесса. Задачи
+    одного типа выполняются последовательно - в процессе через исполнитель
+    с одним потоком, между процессами через блокировку файла
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.db_path = db_path
+        self._executors = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def configure(self, config_path: str) -> None:
+        """
+        Установка пути к хранилищу задач из конфигурационного файла
+        :param config_path: путь к конфигурационному файлу
+        """
+        with open(config_path) as file:
+            config = yaml.load(file, Loader=yaml.FullLoader)
+
+        with self._lock:
+            self.db_path = config["serving"]["jobs_db_path"]
+            self._pid = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """
+        Соединение с хранилищем задач; открывается отдельно в каждом процессе,
+        так как соединение SQLite нельзя использовать после fork
+        """
+        if self._pid != os.getpid():
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.db_path, timeout=30, check_same_thread=False
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, "
+                "status TEXT, progress TEXT, created REAL, started REAL, "
+                "finished REAL, result TEXT, error TEXT, pid INTEGER)"
+            )
+            self._conn.commit()
+            self._pid = os.getpid()
+
+        return self._conn
+
+    def submit(self, kind: str, fn: Callable[[Callable], dict]) -> str:
+        """
+        Постановка задачи в очередь
+        :param kind: тип задачи (train/scrape)
+        :param fn: функция задачи, принимающая функцию записи прогресса
+        :return: идентификатор задачи
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs VALUES (?, ?, 'queued', '{}', ?, NULL, NULL, "
+                "NULL, NULL, ?)",
+                (job_id, kind, time.time(), os.getpid()),
+            )
+            self._db.commit()
+
+            # Исполнители создаются при первой задаче, а не при импорте модуля
+            if kind not in self._executors:
+                self._executors[kind] = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"job-{kind}"
+                )
+            executor = self._executors[kind]
+
+        executor.submit(self._run, job_id, kind, fn)
+
+        return job_id
+
+    def _run(self, job_id: str, kind: str, fn: Callable[[Callable], dict]) -> None:
+        lock_file = None
+        if self.db_path != ":memory:":
+            # Задача одного типа, запущенная в другом процессе, дожидается
+            # завершения текущей (например, два обучения в одну папку модели)
+            lock_file = open(f"{self.db_path}.{kind}.lock", "w")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        try:
+            self._update(job_id, status="running", started=time.time())
+            try:
+                result = fn(lambda **progress: self.report(job_id, **progress))
+            except Exception as e:
+                self._update(
+                    job_id, status="failed", error=str(e), finished=time.time()
+                )
+            else:
+                self._update(
+                    job_id, status="done", result=result, finished=time.time()
+                )
+        finally:
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+    def _update(self, job_id: str, **fields) -> None:
+        values = [
+            json.dumps(value) if name in JSON_FIELDS else value
+            for name, value in fields.items()
+        ]
+        with self._lock:
+            self._db.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} "
+                f"WHERE id = ?",
+                [*values, job_id],
+            )
+            self._db.commit()
+
+    def _load(self, job_id: str) -> Optional[dict]:
+        cursor = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        job = dict(zip([column[0] for column in cursor.description], row))
+        for name in JSON_FIELDS:
+            job[name] = json.loads(job[name]) if job[name] is not None else None
+
+        return job
+
+    def report(self, job_id: str, **progress) -> None:
+        """
+        Запись прогресса выполнения задачи
+        :param job_id: идентификатор задачи
+        :param progress: поля прогресса (эпоха, шаг, количество страниц и т.д.)
+        """
+        with self._lock:
+            job = self._load(job_id)
+            self._db.execute(
+                "UPDATE jobs SET progress = ? WHERE id = ?",
+                (json.dumps({**job["progress"], **progress}), job_id),
+            )
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Получение статуса задачи
+        :param job_id: идентификатор задачи
+        :return: словарь со статусом, прогрессом, временем выполнения и результатом
+        """
+        with self._lock:
+            job = self._load(job_id)
+        if job is None:
+            return None
+
+        # Процесс, выполнявший задачу, завершился аварийно
+        if job["status"] in ("queued", "running") and not is_alive(job["pid"]):
+            job.update(status="failed", error="Процесс задачи завершился")
+            self._update(job_id, status="failed", error=job["error"])
+
+        if job["started"] is not None:
+            job["elapsed"] = round((job["finished"] or time.time()) - job["started"], 1)
+        else:
+            job["elapsed"] = 0.0
+
+        return job
+
+
+def is_alive(pid: int) -> bool:
+    """
+    Проверка, что процесс существует
+    :param pid: идентификатор процесса
+    :return: True, если процесс существует
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+class TrainingProgressCallback(TrainerCallback):
+    """
+    Передача прогресса обучения (эпоха, шаг) в функцию записи прогресса задачи
+    """
+
+    def __init__(self, report: Callable):
+        self.report = report
+
+    def on_step_end(self, args, state, control, **kwargs):
+        self.report(
+            epoch=round(state.epoch or 0, 2),
+            num_epochs=args.num_train_epochs,
+            step=state.global_step,
+            max_steps=state.max_steps,
+        )
+
+
+jobs = JobManager()
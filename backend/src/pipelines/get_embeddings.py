@@ -3,33 +3,154 @@
 Версия 1.0
 """
 
+import os
+
+import numpy as np
 import pandas as pd
-from transformers import BertTokenizer
-from ..tokenize.bert_embeddings import PrepareData, CustomDataset
+import transformers
+from typing import List
+from transformers import BertTokenizerFast
+from ..tokenize.bert_embeddings import PrepareData, CustomDataset, PackedDataset
+from ..tokenize.token_cache import (
+    get_cache_key,
+    load_encodings,
+    save_encodings,
+    load_packed,
+    save_packed,
+)
+from ..train.head import get_pooled_outputs
 
 
-def get_bert_embeddings(data: pd.DataFrame, train_config: dict) -> CustomDataset:
+def get_bert_embeddings(
+    data: pd.DataFrame, train_config: dict, tokenizer: BertTokenizerFast = None
+) -> CustomDataset:
     """
     Полный цикл представления датасета в эмбеддинги модели Bert для использования
     с объектом Trainer
     :param data: dataframe
     :param train_config: словарь с конфигурацией
+    :param tokenizer: уже загруженный токенизатор (при наличии)
     :return dataset: датасет
     """
 
-    tokenizer = BertTokenizer.from_pretrained(train_config["tokenizer_path"])
+    if tokenizer is None:
+        tokenizer = BertTokenizerFast.from_pretrained(train_config["tokenizer_path"])
 
     try:
         # Если датасет содержит реальные метки классов
-        obj_1 = PrepareData(data.reviewText.tolist(), tokenizer)
-        encodings = obj_1.transform()
-
+        encodings = get_encodings(data.reviewText.tolist(), tokenizer, train_config)
         dataset = CustomDataset(encodings, data.target.tolist())
 
     except AttributeError:
         # Обработка для тестового датасета, не содержащего меток класса
-        obj_1 = PrepareData(data.to_list(), tokenizer)
-        encodings = obj_1.transform()
+        encodings = get_encodings(data.to_list(), tokenizer, train_config)
         dataset = CustomDataset(encodings)
 
     return dataset
+
+
+def get_encodings(
+    texts: List[str], tokenizer: BertTokenizerFast, train_config: dict
+) -> dict:
+    """
+    Токенизация текстов с использованием кэша на диске: при повторном запуске
+    на тех же данных токенизация не выполняется
+    :param texts: очищенные тексты отзывов
+    :param tokenizer: токенизатор
+    :param train_config: словарь с конфигурацией
+    :return: словарь массивов input_ids, attention_mask, token_type_ids
+    """
+    cache_dir = train_config["token_cache_dir"]
+    key = get_cache_key(
+        texts, f"{tokenizer.name_or_path}:{len(tokenizer)}", train_config["max_length"]
+    )
+
+    encodings = load_encodings(cache_dir, key)
+    if encodings is None:
+        obj_1 = PrepareData(
+            texts,
+            tokenizer,
+            batch_size_split=train_config["batch_size_split"],
+            max_length=train_config["max_length"],
+        )
+        # Токенизатор записывает результат частями прямо в файлы кэша
+        with save_encodings(
+            cache_dir, key, len(texts), train_config["max_length"]
+        ) as arrays:
+            obj_1.transform(out=arrays)
+        encodings = load_encodings(cache_dir, key)
+
+    return encodings
+
+
+def get_packed_dataset(
+    data: pd.DataFrame, train_config: dict, tokenizer: BertTokenizerFast = None
+) -> PackedDataset:
+    """
+    Датасет последовательностей токенов без дополнения до max_length для
+    обучения с батчами по бюджету токенов; токенизация кэшируется на диске
+    :param data: dataframe
+    :param train_config: словарь с конфигурацией
+    :param tokenizer: уже загруженный токенизатор (при наличии)
+    :return dataset: датасет
+    """
+    if tokenizer is None:
+        tokenizer = BertTokenizerFast.from_pretrained(train_config["tokenizer_path"])
+
+    texts = data.reviewText.tolist()
+    cache_dir = train_config["token_cache_dir"]
+    key = get_cache_key(
+        texts, f"{tokenizer.name_or_path}:{len(tokenizer)}", train_config["max_length"]
+    )
+
+    packed = load_packed(cache_dir, key)
+    if packed is None:
+        sequences = tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=train_config["max_length"],
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )["input_ids"]
+        save_packed(cache_dir, key, sequences)
+        packed = load_packed(cache_dir, key)
+
+    return PackedDataset(*packed, labels=data.target.tolist())
+
+
+def get_pooled_features(
+    texts: List[str],
+    tokenizer: BertTokenizerFast,
+    model: transformers.BertForSequenceClassification,
+    train_config: dict,
+) -> np.ndarray:
+    """
+    Выходы замороженного энкодера Bert с кэшем на диске в float16: энкодер
+    выполняется один раз для данных текстов, токенизатора и модели
+    :param texts: очищенные тексты отзывов
+    :param tokenizer: токенизатор
+    :param model: модель классификации Bert
+    :param train_config: словарь с конфигурацией
+    :return: матрица [число отзывов, размер скрытого слоя]
+    """
+    cache_dir = train_config["feature_cache_dir"]
+    key = get_cache_key(
+        texts,
+        f"{model.name_or_path}:{tokenizer.name_or_path}:{len(tokenizer)}",
+        train_config["max_length"],
+    )
+    path = os.path.join(cache_dir, f"{key}.npy")
+
+    if not os.path.exists(path):
+        features = get_pooled_outputs(
+            model,
+            get_encodings(texts, tokenizer, train_config),
+            batch_size=train_config["per_device_batch_size"],
+        )
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(f"{path}.tmp", "wb") as file:
+            np.save(file, features)
+        os.replace(f"{path}.tmp", path)
+
+    return np.load(path)
@@ -4,18 +4,31 @@
 """
 
 import yaml
+from transformers import BertForSequenceClassification, BertTokenizerFast
+
 from ..data.get_dataset import get_dataset
 from ..data.split_data import split_train_test, get_train_test_data
 from ..transform.transform import transform_labels, pipeline_preprocess
-from ..train.train import bert_training, save_model
-from ..pipelines.get_embeddings import get_bert_embeddings
+from ..train.train import bert_training, save_model, save_label_names
+from ..train.head import train_head
+from ..train.quantize import save_quantized_model, save_quantization_report
+from ..pipelines.get_embeddings import (
+    get_bert_embeddings,
+    get_packed_dataset,
+    get_pooled_features,
+)
 
 
-def pipeline_training(config_path: dict, requires_grad: bool = False) -> None:
+def pipeline_training(
+    config_path: dict, requires_grad: bool = None, callbacks: list = None
+) -> None:
     """
     Пайплайн обучения модели Bert
     :param config_path: конфигурационный словарь
-    :param requires_grad: обновление весовых коэффициентов
+    :param requires_grad: обновление весовых коэффициентов энкодера; False -
+    обучение только классификационной головы на сохраненных выходах энкодера;
+    None - значение из конфигурации (freeze_backbone)
+    :param callbacks: дополнительные callbacks для объекта Trainer
     :return: None
     """
     with open(config_path) as file:
@@ -41,15 +54,65 @@ def pipeline_training(config_path: dict, requires_grad: bool = False) -> None:
     # Разделение train датасета на train/validation
     train_df, val_df = get_train_test_data(train_df, preprocessing_config)
 
-    # Получение объектов, содержащих bert-эмбеддинги
-    train_dataset = get_bert_embeddings(train_df, train_config)
-    val_dataset = get_bert_embeddings(val_df, train_config)
-    test_dataset = get_bert_embeddings(test_df, train_config)
+    if requires_grad is None:
+        requires_grad = not train_config["freeze_backbone"]
+
+    if requires_grad:
+        # Получение объектов, содержащих bert-эмбеддинги: дополненных до
+        # max_length или без дополнения для батчей по бюджету токенов
+        get_dataset_fn = (
+            get_packed_dataset if train_config["dynamic_batching"] else get_bert_embeddings
+        )
+        train_dataset = get_dataset_fn(train_df, train_config)
+        val_dataset = get_dataset_fn(val_df, train_config)
+        test_dataset = get_dataset_fn(test_df, train_config)
+
+        # Обучение модели
+        trainer = bert_training(
+            train_config,
+            train_dataset,
+            val_dataset,
+            test_dataset,
+            requires_grad=True,
+            callbacks=callbacks,
+        )
+
+        # Cохранение обученной модели
+        save_model(trainer, test_config)
+    else:
+        # Энкодер заморожен: его выходы вычисляются один раз и кэшируются,
+        # эпохи обучения проходят только по классификационной голове
+        tokenizer = BertTokenizerFast.from_pretrained(train_config["tokenizer_path"])
+        model = BertForSequenceClassification.from_pretrained(
+            train_config["model_path"]
+        )
+        splits = {"train": train_df, "val": val_df, "test": test_df}
+        features = {
+            name: get_pooled_features(
+                df.reviewText.tolist(), tokenizer, model, train_config
+            )
+            for name, df in splits.items()
+        }
+        labels = {name: df.target.tolist() for name, df in splits.items()}
+
+        model = train_head(model, train_config, features, labels, callbacks=callbacks)
+
+        # Сохранение в том же формате, что и после обучения Trainer
+        model.save_pretrained(test_config["model_path"])
+        save_label_names(test_config)
+
+    # Экспорт в ONNX и сверка логитов с моделью PyTorch - только для варианта
+    # выполнения onnx (onnxruntime нужен только для него)
+    if test_config["backend"] == "onnx":
+        from ..evaluate.onnx_backend import save_onnx_model
 
-    # Обучение модели
-    trainer = bert_training(
-        train_config, train_dataset, val_dataset, test_dataset, requires_grad=True
-    )
+        save_onnx_model(
+            config, test_df.reviewText.tolist()[: test_config["onnx_parity_samples"]]
+        )
 
-    # Cохранение обученной модели
-    save_model(trainer, test_config)
+    # Квантизованная int8-версия модели - для варианта выполнения quantized
+    # или по флагу quantize, сравнение с исходной моделью - только по флагу
+    if train_config["quantize"] or test_config["backend"] == "quantized":
+        save_quantized_model(test_config)
+    if train_config["quantize"]:
+        save_quantization_report(config, test_df)
@@ -5,10 +5,21 @@
 
 import pandas as pd
 
+import json
+import os
+
 from ..data.get_dataset import get_data_for_eda
-from ..tokenize.text_processing import get_most_freq_words
+from ..data.eda_cache import get_file_fingerprint, get_artifact_path
+from ..data.eda_aggregates import compute_eda_aggregates
+from ..tokenize.text_processing import get_most_freq_words, Lemmatizer
+from ..tokenize.freq_index import (
+    FrequencyIndex,
+    build_frequency_index,
+    load_cached,
+    top_k_index_dir,
+)
 
-from typing import Tuple
+from typing import List, Optional, Tuple
 import yaml
 
 
@@ -25,7 +36,147 @@ def pipeline_eda(config_path: str) -> Tuple[pd.DataFrame, list, list]:
         config = yaml.load(file, Loader=yaml.FullLoader)
     preprocessing_config = config["preprocessing"]
 
-    eda_data = get_data_for_eda(preprocessing_config["train_path"])
-    words, count = get_most_freq_words(eda_data)
+    eda_data = get_data_for_eda(
+        preprocessing_config["train_path"],
+        cache_dir=preprocessing_config["eda_cache_dir"],
+    )
+    index = get_frequency_index(preprocessing_config, eda_data)
+    words, count = get_most_freq_words(eda_data, index=index)
 
     return eda_data, words, count
+
+
+def get_frequency_index(
+    preprocessing_config: dict,
+    eda_data: pd.DataFrame = None,
+    lemmatize: bool = None,
+) -> FrequencyIndex:
+    """
+    Частотный словарь обучающего датасета: хранится рядом с характеристиками
+    для EDA и перестраивается только при изменении файла датасета; загруженный
+    словарь остается в памяти процесса
+    :param preprocessing_config: словарь с конфигурацией
+    :param eda_data: датафрейм для EDA; None - загружается, только если
+    словарь еще не построен
+    :param lemmatize: подсчет частот по леммам; None - значение из конфигурации
+    :return: частотный словарь
+    """
+    if lemmatize is None:
+        lemmatize = preprocessing_config["lemmatize"]
+
+    fingerprint = get_file_fingerprint(preprocessing_config["train_path"])
+    index_path = get_artifact_path(
+        preprocessing_config["eda_cache_dir"],
+        fingerprint,
+        suffix="freq_lemma.json" if lemmatize else "freq.json",
+    )
+    if os.path.exists(index_path):
+        return load_cached(index_path)
+
+    if eda_data is None:
+        eda_data = get_data_for_eda(
+            preprocessing_config["train_path"],
+            cache_dir=preprocessing_config["eda_cache_dir"],
+        )
+    reviews = eda_data.reviewText.tolist()
+    if lemmatize:
+        lemmatizer = Lemmatizer(
+            cache_path=preprocessing_config["lemma_cache_path"],
+            max_size=preprocessing_config["lemma_cache_size"],
+        )
+        reviews = lemmatizer.lemmatize(reviews)
+        lemmatizer.save()
+
+    index = build_frequency_index(reviews, eda_data.target.tolist())
+    index.save(index_path)
+
+    return index
+
+
+def pipeline_freq_words(
+    config_path: str,
+    source: str = "train",
+    k: int = 30,
+    target: Optional[int] = None,
+    ngram: int = 1,
+    lemmatize: Optional[bool] = None,
+) -> Tuple[List[str], List[int]]:
+    """
+    Самые частые слова или биграммы корпуса
+    :param config_path: пусть к конфигурационному файлу
+    :param source: корпус: train - обучающий датасет, scrape - собранные отзывы,
+    upload - отзывы, загруженные для предсказания (метки - предсказанные классы)
+    :param k: количество элементов
+    :param target: метка класса; None - весь корпус
+    :param ngram: 1 - слова, 2 - биграммы
+    :param lemmatize: подсчет частот по леммам (для обучающего датасета);
+    None - значение из конфигурации
+    :return words: список слов
+    :return count: количество употреблений в корпусе
+    """
+    with open(config_path) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+    preprocessing_config = config["preprocessing"]
+
+    if source == "upload":
+        return top_k_index_dir(
+            preprocessing_config["upload_freq_index_dir"],
+            k,
+            target=target,
+            ngram=ngram,
+        )
+
+    if source == "scrape":
+        index = load_cached(preprocessing_config["scrape_freq_index_path"])
+    else:
+        index = get_frequency_index(preprocessing_config, lemmatize=lemmatize)
+
+    return index.top_k(k, target=target, ngram=ngram)
+
+
+def get_eda_version(config_path: str) -> str:
+    """
+    Версия данных для EDA - отпечаток файла обучающего датасета
+    :param config_path: пусть к конфигурационному файлу
+    :return: версия
+    """
+    with open(config_path) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+
+    return get_file_fingerprint(config["preprocessing"]["train_path"])
+
+
+def pipeline_eda_aggregates(config_path: str) -> dict:
+    """
+    Агрегаты для графиков EDA по классам: хранятся рядом с характеристиками
+    для EDA и пересчитываются только при изменении файла датасета
+    :param config_path: пусть к конфигурационному файлу
+    :return: словарь агрегатов
+    """
+    with open(config_path) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+    preprocessing_config = config["preprocessing"]
+
+    fingerprint = get_file_fingerprint(preprocessing_config["train_path"])
+    aggregates_path = get_artifact_path(
+        preprocessing_config["eda_cache_dir"], fingerprint, suffix="aggregates.json"
+    )
+    if os.path.exists(aggregates_path):
+        with open(aggregates_path) as file:
+            return {**json.load(file), "version": fingerprint}
+
+    eda_data = get_data_for_eda(
+        preprocessing_config["train_path"],
+        cache_dir=preprocessing_config["eda_cache_dir"],
+    )
+    aggregates = compute_eda_aggregates(
+        eda_data,
+        grid_size=preprocessing_config["eda_kde_grid_size"],
+        max_fliers=preprocessing_config["eda_max_fliers"],
+    )
+
+    with open(f"{aggregates_path}.tmp", "w") as file:
+        json.dump(aggregates, file)
+    os.replace(f"{aggregates_path}.tmp", aggregates_path)
+
+    return {**aggregates, "version": fingerprint}
@@ -0,0 +1,113 @@
+"""
+Программа запуска сервиса в режиме pre-fork: модель загружается один раз
+в главном процессе, рабочие процессы uvicorn создаются через fork и
+разделяют веса модели
+Версия 1.0
+"""
+
+import gc
+import os
+import signal
+import socket
+
+import torch
+import uvicorn
+import yaml
+
+from ..evaluate.registry import registry
+
+
+def share_model_weights() -> None:
+    """
+    Перенос весов загруженной модели в разделяемую память, чтобы рабочие
+    процессы использовали одну копию весов
+    """
+    if isinstance(registry.model, torch.nn.Module):
+        registry.model.share_memory()
+
+    # Объекты, созданные до fork, исключаются из сборки мусора: сборщик
+    # не будет изменять их заголовки и копировать страницы памяти в каждый процесс
+    gc.collect()
+    gc.freeze()
+
+
+def run_worker(app, sock: socket.socket, torch_threads: int, log_config: str) -> None:
+    """
+    Рабочий процесс: ограничение числа потоков torch и запуск uvicorn
+    на общем сокете
+    :param app: приложение FastAPI
+    :param sock: сокет, открытый в главном процессе
+    :param torch_threads: количество intra-op потоков torch
+    :param log_config: путь к конфигурации логирования
+    """
+    torch.set_num_threads(torch_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Число inter-op потоков нельзя изменить после их запуска
+        pass
+
+    server = uvicorn.Server(uvicorn.Config(app, log_config=log_config))
+    server.run(sockets=[sock])
+
+
+def serve_prefork(app, config_path: str, log_config: str = "log_config.yaml") -> None:
+    """
+    Запуск сервиса: загрузка модели, открытие сокета, fork рабочих процессов
+    и их перезапуск при аварийном завершении
+    :param app: приложение FastAPI
+    :param config_path: путь к конфигурационному файлу
+    :param log_config: путь к конфигурации логирования
+    """
+    with open(config_path) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+    serving_config = config["serving"]
+
+    # Модель загружается до fork, если она уже обучена
+    registry.load(config_path)
+    share_model_weights()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((serving_config["host"], serving_config["port"]))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    def spawn() -> int:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_worker(app, sock, serving_config["torch_threads"], log_config)
+            finally:
+                os._exit(0)
+        return pid
+
+    workers = {spawn() for _ in range(serving_config["workers"])}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+
+        # Перезапуск рабочего процесса, завершившегося не по сигналу остановки
+        if not stopping:
+            workers.add(spawn())
+
+    sock.close()
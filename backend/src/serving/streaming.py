@@ -0,0 +1,79 @@
+"""
+Программа потоковой отдачи результатов синхронного генератора, который
+должен выполняться целиком в одном потоке
+Версия 1.0
+"""
+
+import queue
+import threading
+from typing import AsyncIterator, Callable, Iterator
+
+from starlette.concurrency import run_in_threadpool
+
+# Интервал проверки остановки при ожидании очереди, секунды
+POLL_INTERVAL = 0.5
+
+
+async def iterate_in_thread(
+    iterator_fn: Callable[[], Iterator[str]], max_buffer: int = 8
+) -> AsyncIterator[str]:
+    """
+    Выполнение генератора в отдельном потоке с передачей элементов через
+    очередь. StreamingResponse вызывает next() синхронного генератора в разных
+    потоках пула, а генератор парсинга использует соединение SQLite и
+    исполнители, привязанные к потоку, в котором они созданы
+    :param iterator_fn: функция, создающая генератор
+    :param max_buffer: максимальное количество элементов в очереди
+    :return: элементы генератора
+    """
+    items = queue.Queue(maxsize=max_buffer)
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        # Ожидание места в очереди до отключения клиента
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        iterator = iterator_fn()
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    break
+        except Exception as e:
+            put((done, e))
+        else:
+            put((done, None))
+        finally:
+            # Завершение генератора (блоки finally) в том же потоке
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def get():
+        try:
+            return items.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            return None
+
+    threading.Thread(target=produce, name="stream", daemon=True).start()
+    try:
+        while True:
+            entry = await run_in_threadpool(get)
+            if entry is None:
+                continue
+
+            item, error = entry
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
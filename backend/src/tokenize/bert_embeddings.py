@@ -1,8 +1,14 @@
 from tqdm.auto import tqdm
+import numpy as np
 import torch
 import torch.utils.data
 
 
+# Наибольшее количество отзывов, кодируемых токенизатором за один вызов:
+# промежуточный результат токенизатора (int64) не зависит от размера корпуса
+MAX_SPLIT_SIZE = 4096
+
+
 class PrepareData:
     """
     Представление текстов с помощью bert-эмбеддингов
@@ -20,36 +26,45 @@ class PrepareData:
             text,
             add_special_tokens=True,
             max_length=self.max_length,
-            pad_to_max_length=True,
+            padding="max_length",
             truncation=True,
             return_attention_mask=True,
-            return_tensors="pt",
+            return_token_type_ids=True,
+            return_tensors="np",
         )
 
-    def transform(self):
+    def transform(self, out=None):
+        """
+        Кодирование текстов частями в заранее выделенные массивы, без повторных torch.cat
+        :param out: словарь массивов [число отзывов, max_length] для записи
+        результата (например, файлы на диске в компактных типах); по умолчанию
+        создаются тензоры int64 в памяти
+        :return: словарь input_ids, attention_mask, token_type_ids
+        """
         N = len(self.texts)
-        size_split = (N // self.batch_size_split) or N
-
-        train_encodings = self.pre_tokenizer(self.texts[:size_split])
-        input_ids = train_encodings["input_ids"]
-        attention_mask = train_encodings["attention_mask"]
-        token_type_ids = train_encodings["token_type_ids"]
-
-        for pos in tqdm(range(size_split, N, size_split)):
-            train_encodings_2 = self.pre_tokenizer(self.texts[pos : pos + size_split])
-            input_ids = torch.cat((input_ids, train_encodings_2["input_ids"]))
-            attention_mask = torch.cat(
-                (attention_mask, train_encodings_2["attention_mask"])
-            )
-            token_type_ids = torch.cat(
-                (token_type_ids, train_encodings_2["token_type_ids"])
-            )
-        return {
-            "input_ids": input_ids,
-            "attention_mask": attention_mask,
-            "token_type_ids": token_type_ids,
+        size_split = min((N // self.batch_size_split) or N, MAX_SPLIT_SIZE)
+
+        encodings = out
+        if encodings is None:
+            encodings = {
+                key: torch.zeros((N, self.max_length), dtype=torch.long)
+                for key in ["input_ids", "attention_mask", "token_type_ids"]
+            }
+        arrays = {
+            key: array.numpy() if isinstance(array, torch.Tensor) else array
+            for key, array in encodings.items()
         }
 
+        # Части кодируются последовательно: быстрый токенизатор сам
+        # распараллеливает кодирование батча по ядрам; при записи
+        # результат приводится к типу массива
+        for pos in tqdm(range(0, N, size_split)):
+            batch_encodings = self.pre_tokenizer(self.texts[pos : pos + size_split])
+            for key, array in arrays.items():
+                array[pos : pos + size_split] = batch_encodings[key]
+
+        return encodings
+
 
 class CustomDataset(torch.utils.data.Dataset):
     """
@@ -62,12 +77,152 @@ class CustomDataset(torch.utils.data.Dataset):
         self.labels = labels
 
     def __getitem__(self, idx):
-        item = {key: torch.tensor(val[idx]) for key, val in self.encodings.items()}
+        # Строки массивов с диска возвращаются как срезы, без создания тензоров;
+        # батч собирается и приводится к int64 один раз в EncodingsCollator
+        item = {key: val[idx] for key, val in self.encodings.items()}
         # Если датасет содержит метки класса
         if self.labels:
-            item["labels"] = torch.tensor(self.labels[idx])
+            item["labels"] = self.labels[idx]
 
         return item
 
     def __len__(self):
         return len(self.encodings["input_ids"])
+
+
+class PackedDataset(torch.utils.data.Dataset):
+    """
+    Датасет последовательностей токенов без дополнения: отзывы хранятся
+    подряд в одном массиве, границы задаются смещениями
+    """
+
+    def __init__(self, input_ids, offsets, labels=None):
+        self.input_ids = input_ids
+        self.offsets = offsets
+        self.labels = labels
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def __getitem__(self, idx):
+        item = {"input_ids": self.input_ids[self.offsets[idx] : self.offsets[idx + 1]]}
+        # Если датасет содержит метки класса
+        if self.labels:
+            item["labels"] = self.labels[idx]
+
+        return item
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class BatchOrderSampler(torch.utils.data.Sampler):
+    """
+    Порядок батчей в эпохе: перемешивание генератором с seed = random_state +
+    номер эпохи. Номер эпохи задает Trainer через set_epoch
+    """
+
+    def __init__(self, n_batches, random_state=0, shuffle=True):
+        self.n_batches = n_batches
+        self.random_state = random_state
+        self.shuffle = shuffle
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __iter__(self):
+        if not self.shuffle:
+            return iter(range(self.n_batches))
+
+        rng = np.random.default_rng(self.random_state + self.epoch)
+        return iter(rng.permutation(self.n_batches).tolist())
+
+    def __len__(self):
+        return self.n_batches
+
+
+class TokenBudgetBatchSampler(torch.utils.data.Sampler):
+    """
+    Батчи из отзывов близкой длины, ограниченные суммарным количеством токенов
+    после дополнения (строки x длина самого длинного отзыва), а не числом строк.
+    Состав батчей фиксирован, порядок батчей задает sampler (BatchOrderSampler):
+    accelerate передает ему номер эпохи так же, как сэмплеру BatchSampler
+    """
+
+    def __init__(self, lengths, max_tokens, random_state=0, shuffle=True):
+        self.max_tokens = max_tokens
+
+        # Сортировка по длине, отзывы одной длины - в случайном порядке
+        rng = np.random.default_rng(random_state)
+        order = np.lexsort((rng.random(len(lengths)), lengths))
+
+        self.batches = []
+        batch = []
+        for idx in order:
+            # Отзывы идут по возрастанию длины, новый отзыв - самый длинный в батче
+            if batch and int(lengths[idx]) * (len(batch) + 1) > max_tokens:
+                self.batches.append(batch)
+                batch = []
+            batch.append(int(idx))
+        if batch:
+            self.batches.append(batch)
+
+        self.sampler = BatchOrderSampler(
+            len(self.batches), random_state=random_state, shuffle=shuffle
+        )
+
+    def __iter__(self):
+        for i in self.sampler:
+            yield self.batches[i]
+
+    def __len__(self):
+        return len(self.batches)
+
+
+class EncodingsCollator:
+    """
+    Сборка батча из строк массивов компактных типов: одна копия в массив
+    int64 на батч вместо тензора на каждую строку
+    """
+
+    def __call__(self, items):
+        batch = {
+            key: torch.from_numpy(
+                np.stack([np.asarray(item[key]) for item in items], dtype=np.int64)
+            )
+            for key in ["input_ids", "attention_mask", "token_type_ids"]
+        }
+        if "labels" in items[0]:
+            batch["labels"] = torch.tensor([item["labels"] for item in items])
+
+        return batch
+
+
+class DynamicPaddingCollator:
+    """
+    Дополнение батча до длины самого длинного отзыва в нем
+    """
+
+    def __init__(self, pad_token_id=0):
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, items):
+        length = max(len(item["input_ids"]) for item in items)
+        input_ids = np.full((len(items), length), self.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(items), length), dtype=np.int64)
+
+        for row, item in enumerate(items):
+            input_ids[row, : len(item["input_ids"])] = item["input_ids"]
+            attention_mask[row, : len(item["input_ids"])] = 1
+
+        batch = {
+            "input_ids": torch.from_numpy(input_ids),
+            "attention_mask": torch.from_numpy(attention_mask),
+            "token_type_ids": torch.zeros((len(items), length), dtype=torch.long),
+        }
+        if "labels" in items[0]:
+            batch["labels"] = torch.tensor([item["labels"] for item in items])
+
+        return batch
@@ -0,0 +1,422 @@
+"""
+Программа построения частотного словаря корпуса отзывов с поддержкой
+дополнения, объединения и сохранения на диск
+Версия 1.0
+"""
+
+import fcntl
+import heapq
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from collections import Counter
+from operator import itemgetter
+from typing import Iterable, List, Optional, Tuple
+
+from .text_processing import PARALLEL_THRESHOLD, map_in_parts
+
+PUNCTUATION_MARKS = {
+    "!",
+    ",",
+    "(",
+    ")",
+    ":",
+    "-",
+    "?",
+    ".",
+    "..",
+    "...",
+    "«",
+    "»",
+    ";",
+    "–",
+    "--",
+}
+
+# Загруженные словари: путь -> (отметка файла, словарь)
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def get_terms(review: str) -> List[str]:
+    """
+    Слова отзыва, учитываемые в частотном словаре (без знаков препинания
+    и коротких слов)
+    :param review: очищенный текст отзыва
+    :return: список слов
+    """
+    return [
+        word
+        for word in review.split()
+        if word not in PUNCTUATION_MARKS and len(word) > 3
+    ]
+
+
+class FrequencyIndex:
+    """
+    Частотный словарь слов и биграмм: общий и в разрезе целевой переменной.
+    Словари разных частей корпуса объединяются сложением счетчиков
+    """
+
+    def __init__(self):
+        # Ключ "all" - весь корпус, "0"/"1" - отзывы с соответствующей меткой
+        self.unigrams = {}
+        self.bigrams = {}
+        self.n_reviews = 0
+
+    def update(
+        self, reviews: Iterable[str], targets: Optional[Iterable[int]] = None
+    ) -> "FrequencyIndex":
+        """
+        Дополнение словаря новыми отзывами
+        :param reviews: очищенные тексты отзывов
+        :param targets: метки классов (при наличии)
+        :return: self
+        """
+        reviews = list(reviews)
+        if targets is None:
+            targets = [None] * len(reviews)
+
+        for review, target in zip(reviews, targets):
+            terms = get_terms(review)
+            keys = ["all"] if target is None else ["all", str(int(target))]
+
+            for key in keys:
+                self.unigrams.setdefault(key, Counter()).update(terms)
+                self.bigrams.setdefault(key, Counter()).update(
+                    f"{first} {second}" for first, second in zip(terms, terms[1:])
+                )
+
+        self.n_reviews += len(reviews)
+
+        return self
+
+    def merge(self, other: "FrequencyIndex") -> "FrequencyIndex":
+        """
+        Объединение со словарем другой части корпуса
+        :param other: частотный словарь
+        :return: self
+        """
+        for own, others in [(self.unigrams, other.unigrams), (self.bigrams, other.bigrams)]:
+            for key, counter in others.items():
+                own.setdefault(key, Counter()).update(counter)
+        self.n_reviews += other.n_reviews
+
+        return self
+
+    def top_k(
+        self, k: int = 30, target: Optional[int] = None, ngram: int = 1
+    ) -> Tuple[List[str], List[int]]:
+        """
+        Самые частые слова или биграммы
+        :param k: количество элементов
+        :param target: метка класса; None - весь корпус
+        :param ngram: 1 - слова, 2 - биграммы
+        :return words: список слов
+        :return count: количество употреблений в корпусе
+        """
+        counters = self.unigrams if ngram == 1 else self.bigrams
+        counter = counters.get("all" if target is None else str(int(target)), Counter())
+
+        # Частичная сортировка кучей вместо полной сортировки словаря
+        most = heapq.nlargest(k, counter.items(), key=itemgetter(1))
+
+        return [term for term, _ in most], [count for _, count in most]
+
+    def save(self, path: str) -> None:
+        """
+        Сохранение словаря на диск
+        :param path: путь к файлу
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(
+                {
+                    "n_reviews": self.n_reviews,
+                    "unigrams": self.unigrams,
+                    "bigrams": self.bigrams,
+                },
+                file,
+                ensure_ascii=False,
+            )
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "FrequencyIndex":
+        """
+        Загрузка словаря с диска; если файла нет - пустой словарь
+        :param path: путь к файлу
+        :return: частотный словарь
+        """
+        index = cls()
+        if not os.path.exists(path):
+            return index
+
+        with open(path) as file:
+            state = json.load(file)
+        index.n_reviews = state["n_reviews"]
+        index.unigrams = {key: Counter(value) for key, value in state["unigrams"].items()}
+        index.bigrams = {key: Counter(value) for key, value in state["bigrams"].items()}
+
+        return index
+
+
+def build_shard(shard: List[Tuple[str, Optional[int]]]) -> FrequencyIndex:
+    """
+    Построение словаря для части корпуса
+    :param shard: пары (отзыв, метка класса)
+    :return: частотный словарь
+    """
+    return FrequencyIndex().update(
+        [review for review, _ in shard], [target for _, target in shard]
+    )
+
+
+def build_frequency_index(
+    reviews: List[str], targets: Optional[List[int]] = None
+) -> FrequencyIndex:
+    """
+    Построение частотного словаря корпуса; большой корпус делится на части,
+    словари частей строятся в пуле процессов и объединяются
+    :param reviews: очищенные тексты отзывов
+    :param targets: метки классов (при наличии)
+    :return: частотный словарь
+    """
+    if targets is None:
+        targets = [None] * len(reviews)
+
+    index = FrequencyIndex()
+    for shard_index in map_in_parts(
+        build_shard, list(zip(reviews, targets)), PARALLEL_THRESHOLD
+    ):
+        index.merge(shard_index)
+
+    return index
+
+
+def get_file_stamp(path: str) -> Optional[tuple]:
+    """
+    Отметка файла (размер и время изменения); None - файла нет
+    :param path: путь к файлу
+    :return: отметка файла
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_cached(path: str) -> FrequencyIndex:
+    """
+    Загрузка словаря с кэшем в памяти процесса: файл читается повторно только
+    при изменении; возвращаемый словарь изменять нельзя
+    :param path: путь к файлу
+    :return: частотный словарь
+    """
+    stamp = get_file_stamp(path)
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+    index = FrequencyIndex.load(path)
+    with _loaded_lock:
+        _loaded[path] = (stamp, index)
+
+    return index
+
+
+def update_index_file(
+    path: str, reviews: List[str], targets: Optional[List[int]] = None
+) -> None:
+    """
+    Дополнение словаря в файле новыми отзывами. Файл читается и перезаписывается
+    под блокировкой, чтобы параллельные запуски (в том числе в разных процессах)
+    не теряли отзывы друг друга
+    :param path: путь к файлу
+    :param reviews: очищенные тексты отзывов
+    :param targets: метки классов (при наличии)
+    """
+    if not reviews:
+        return
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            FrequencyIndex.load(path).update(reviews, targets).save(path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def append_shard(
+    index_dir: str,
+    reviews: List[str],
+    targets: Optional[List[int]] = None,
+    compact_every: int = 100,
+) -> None:
+    """
+    Дополнение словаря в папке новыми отзывами: отзывы записываются отдельной
+    частью (запись не зависит от размера словаря), накопившиеся части
+    объединяются с основным файлом base.json
+    :param index_dir: папка словаря
+    :param reviews: очищенные тексты отзывов
+    :param targets: метки классов (при наличии)
+    :param compact_every: количество частей, после которого они объединяются
+    """
+    if not reviews:
+        return
+
+    os.makedirs(index_dir, exist_ok=True)
+    FrequencyIndex().update(reviews, targets).save(
+        os.path.join(index_dir, f"shard-{uuid.uuid4().hex}.json")
+    )
+
+    shards = [name for name in os.listdir(index_dir) if name.startswith("shard-")]
+    if len(shards) < compact_every:
+        return
+
+    # Объединение выполняет один процесс, остальные продолжают дописывать части
+    with open(os.path.join(index_dir, "compact.lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+
+        base_path = os.path.join(index_dir, "base.json")
+        index = FrequencyIndex.load(base_path)
+        shards = sorted(
+            name
+            for name in os.listdir(index_dir)
+            if name.startswith("shard-") and name.endswith(".json")
+        )
+        for name in shards:
+            index.merge(FrequencyIndex.load(os.path.join(index_dir, name)))
+
+        # Части удаляются до замены основного файла: процесс, прочитавший
+        # прежний основной файл, загрузит словарь заново после замены и не
+        # учтет части дважды
+        index.save(f"{base_path}.new")
+        for name in shards:
+            os.remove(os.path.join(index_dir, name))
+        os.replace(f"{base_path}.new", base_path)
+
+
+class ShardWriter:
+    """
+    Фоновое дополнение словарей в папках: отзывы ставятся в очередь без
+    ожидания записи на диск, отдельный поток объединяет накопившиеся в очереди
+    отзывы и записывает их одной частью через append_shard
+    """
+
+    def __init__(self, max_pending: int = 64):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        index_dir: str,
+        reviews: List[str],
+        targets: Optional[List[int]] = None,
+        compact_every: int = 100,
+    ) -> bool:
+        """
+        Постановка отзывов в очередь записи
+        :param index_dir: папка словаря
+        :param reviews: очищенные тексты отзывов
+        :param targets: метки классов (при наличии)
+        :param compact_every: количество частей, после которого они объединяются
+        :return: False, если очередь заполнена и отзывы не будут учтены
+        """
+        if not reviews:
+            return True
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="freq-index", daemon=True
+                )
+                self._thread.start()
+
+        if targets is None:
+            targets = [None] * len(reviews)
+        try:
+            self._queue.put_nowait((index_dir, compact_every, list(reviews), list(targets)))
+        except queue.Full:
+            return False
+
+        return True
+
+    def join(self) -> None:
+        """
+        Ожидание записи всех отзывов, поставленных в очередь
+        """
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            batches = [self._queue.get()]
+            while True:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Отзывы для одной папки записываются одной частью
+            pending = {}
+            for index_dir, compact_every, reviews, targets in batches:
+                entry = pending.setdefault((index_dir, compact_every), ([], []))
+                entry[0].extend(reviews)
+                entry[1].extend(targets)
+
+            for (index_dir, compact_every), (reviews, targets) in pending.items():
+                try:
+                    append_shard(index_dir, reviews, targets, compact_every)
+                except Exception:
+                    logging.getLogger("uvicorn.error").exception(
+                        "Ошибка записи частотного словаря %s", index_dir
+                    )
+
+            for _ in batches:
+                self._queue.task_done()
+
+
+def top_k_index_dir(
+    index_dir: str, k: int = 30, target: Optional[int] = None, ngram: int = 1
+) -> Tuple[List[str], List[int]]:
+    """
+    Самые частые слова словаря из папки. Словарь хранится в памяти процесса:
+    к нему добавляются только новые части, после объединения частей другим
+    процессом он загружается заново
+    :param index_dir: папка словаря
+    :param k: количество элементов
+    :param target: метка класса; None - весь корпус
+    :param ngram: 1 - слова, 2 - биграммы
+    :return words: список слов
+    :return count: количество употреблений в корпусе
+    """
+    base_path = os.path.join(index_dir, "base.json")
+    base_stamp = get_file_stamp(base_path)
+
+    # Словарь дополняется и читается под блокировкой, так как он общий
+    # для всех потоков процесса
+    with _loaded_lock:
+        cached = _loaded.get(index_dir)
+        if cached is None or cached[0] != base_stamp:
+            cached = (base_stamp, FrequencyIndex.load(base_path), set())
+            _loaded[index_dir] = cached
+        _, index, merged = cached
+
+        names = os.listdir(index_dir) if os.path.isdir(index_dir) else []
+        for name in sorted(set(names) - merged):
+            if name.startswith("shard-") and name.endswith(".json"):
+                index.merge(FrequencyIndex.load(os.path.join(index_dir, name)))
+                merged.add(name)
+
+        return index.top_k(k, target=target, ngram=ngram)
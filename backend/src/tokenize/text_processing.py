@@ -3,11 +3,146 @@
 Версия 1.0
 """
 
+import json
+import multiprocessing
+import os
 import re
+import threading
+import numpy as np
 import pandas as pd
-from collections import Counter
-from itertools import chain
-from typing import Tuple, List
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Callable, Sequence, Tuple, List
+
+if TYPE_CHECKING:
+    from .freq_index import FrequencyIndex
+
+# Скомпилированные шаблоны очистки текста
+PUNCT_PATTERN = re.compile(r"([.,!?])")
+NON_LETTER_PATTERN = re.compile(r"[^а-яА-Я.,!?]+")
+SPACES_PATTERN = re.compile(r"\s{2,}")
+LOWER_NON_LETTER_PATTERN = re.compile(r"[^а-я.,!?]+")
+
+# Начиная с этого количества отзывов обработка выполняется в нескольких процессах
+PARALLEL_THRESHOLD = 50000
+
+
+class ProcessPool:
+    """
+    Долгоживущий пул процессов, общий для всех вызовов в процессе сервиса.
+    Процессы запускаются через forkserver, а не копированием процесса
+    с загруженной моделью и запущенными потоками; пул создается заново после
+    аварийного завершения процесса пула или при изменении количества процессов
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._max_workers = None
+        self._lock = threading.Lock()
+
+    def get(self, max_workers: int) -> ProcessPoolExecutor:
+        """
+        Получение пула процессов, при первом обращении пул создается
+        :param max_workers: количество процессов
+        :return: пул процессов
+        """
+        with self._lock:
+            # Прежний пул завершится после выполнения уже отправленных задач,
+            # когда на него не останется ссылок
+            if self._executor is None or self._max_workers != max_workers:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+                self._max_workers = max_workers
+
+            return self._executor
+
+    def reset(self, executor: ProcessPoolExecutor) -> None:
+        """
+        Удаление пула, процесс которого завершился аварийно
+        :param executor: неисправный пул процессов
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def submit(self, fn: Callable, *args, max_workers: int) -> Future:
+        """
+        Отправка задачи в пул процессов; неисправный пул создается заново.
+        Если процесс пула завершится аварийно во время выполнения задачи,
+        задача завершится ошибкой BrokenProcessPool, а следующие задачи
+        выполнит новый пул
+        :param fn: функция
+        :param args: аргументы функции
+        :param max_workers: количество процессов
+        :return: Future с результатом функции
+        """
+        for attempt in range(2):
+            executor = self.get(max_workers)
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self.reset(executor)
+                if attempt:
+                    raise
+                continue
+
+            future.add_done_callback(lambda done: self._check(done, executor))
+            return future
+
+    def _check(self, future: Future, executor: ProcessPoolExecutor) -> None:
+        if not future.cancelled() and isinstance(
+            future.exception(), BrokenProcessPool
+        ):
+            self.reset(executor)
+
+    def map(self, fn: Callable, items: list, max_workers: int) -> list:
+        """
+        Применение функции к элементам в пуле процессов; если процесс пула
+        завершился аварийно, пул создается заново и задачи выполняются еще раз
+        :param fn: функция
+        :param items: элементы
+        :param max_workers: количество процессов
+        :return: результаты в порядке элементов
+        """
+        for attempt in range(2):
+            executor = self.get(max_workers)
+            try:
+                return list(executor.map(fn, items))
+            except BrokenProcessPool:
+                self.reset(executor)
+                if attempt:
+                    raise
+
+
+# Пул процессов обработки больших корпусов отзывов
+process_pool = ProcessPool()
+
+
+def map_in_parts(
+    fn: Callable, items: Sequence, parallel_threshold: int = PARALLEL_THRESHOLD
+) -> list:
+    """
+    Обработка последовательности по частям: большая последовательность делится
+    на части по количеству процессоров, части обрабатываются в общем пуле
+    процессов; небольшая обрабатывается целиком в текущем процессе
+    :param fn: функция обработки части последовательности
+    :param items: список или столбец
+    :param parallel_threshold: минимальная длина последовательности для пула процессов
+    :return: результаты обработки частей в исходном порядке
+    """
+    n_jobs = os.cpu_count() or 1
+    if len(items) < parallel_threshold or n_jobs == 1:
+        return [fn(items)]
+
+    bounds = np.linspace(0, len(items), n_jobs + 1).astype(int)
+    rows = items.iloc if isinstance(items, pd.Series) else items
+    parts = [rows[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    return process_pool.map(fn, parts, max_workers=n_jobs)
 
 
 def clean_text(s: str) -> str:
@@ -20,62 +155,134 @@ def clean_text(s: str) -> str:
     # приведение букв в нижный регистр
     s = s.lower()
     # отделение пробелами символов ".", ",", "!", "?"
-    s = re.sub(r"([.,!?])", r" \1 ", s)
+    s = PUNCT_PATTERN.sub(r" \1 ", s)
     # заменить на пробелы все символы, кроме а-я, А-Я, ".", ",", "!", "?"
-    s = re.sub(r"[^а-яА-Я.,!?]+", " ", s)
+    s = NON_LETTER_PATTERN.sub(" ", s)
     # убрать дублирующие пробелы
-    s = re.sub(r"\s{2,}", " ", s)
+    s = SPACES_PATTERN.sub(" ", s)
     # убрать пробелы в начале и в конце строки
     s = s.strip()
     return s
 
 
-def get_most_freq_words(data: pd.DataFrame) -> Tuple[List, List[int]]:
+def clean_text_fast(s: str) -> str:
+    """
+    Очистка текста за один проход регулярного выражения, результат совпадает
+    с clean_text: после приведения к нижнему регистру заглавные буквы А-Я не
+    встречаются, а разбиение по пробелам убирает дублирующие и крайние пробелы
+    """
+    s = LOWER_NON_LETTER_PATTERN.sub(" ", s.lower())
+    for mark in ".,!?":
+        s = s.replace(mark, f" {mark} ")
+    return " ".join(s.split())
+
+
+def clean_series(texts: pd.Series) -> pd.Series:
+    """
+    Очистка столбца отзывов, результат совпадает с поэлементным применением clean_text
+    :param texts: столбец отзывов
+    :return: столбец очищенных отзывов
+    """
+    return pd.Series(
+        [clean_text_fast(text) for text in texts.tolist()],
+        index=texts.index,
+        name=texts.name,
+        dtype=object,
+    )
+
+
+def clean_texts(
+    texts: pd.Series, parallel_threshold: int = PARALLEL_THRESHOLD
+) -> pd.Series:
+    """
+    Очистка столбца отзывов; большие столбцы делятся на части и очищаются
+    в пуле процессов
+    :param texts: столбец отзывов
+    :param parallel_threshold: минимальное количество отзывов для пула процессов
+    :return: столбец очищенных отзывов
+    """
+    cleaned = map_in_parts(clean_series, texts, parallel_threshold)
+
+    return cleaned[0] if len(cleaned) == 1 else pd.concat(cleaned)
+
+
+class Lemmatizer:
+    """
+    Приведение слов к начальной форме (pymorphy3) с ограниченным кэшем
+    "словоформа - лемма", сохраняемым между запусками
+    """
+
+    def __init__(self, cache_path: str = None, max_size: int = 200000):
+        try:
+            import pymorphy3
+        except ImportError as e:
+            raise ImportError(
+                "Для лемматизации необходимо установить пакет pymorphy3"
+            ) from e
+
+        self.morph = pymorphy3.MorphAnalyzer()
+        self.cache_path = cache_path
+        self.max_size = max_size
+        self.cache = OrderedDict()
+
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path) as file:
+                self.cache.update(json.load(file))
+
+    def lemma(self, word: str) -> str:
+        """
+        Начальная форма слова
+        :param word: словоформа
+        :return: лемма
+        """
+        if word in self.cache:
+            self.cache.move_to_end(word)
+            return self.cache[word]
+
+        lemma = self.morph.parse(word)[0].normal_form
+        self.cache[word] = lemma
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+        return lemma
+
+    def lemmatize(self, reviews: List[str]) -> List[str]:
+        """
+        Приведение всех слов отзывов к начальной форме
+        :param reviews: очищенные тексты отзывов
+        :return: лемматизированные тексты отзывов
+        """
+        return [" ".join(self.lemma(word) for word in review.split()) for review in reviews]
+
+    def save(self) -> None:
+        """
+        Сохранение кэша лемм на диск
+        """
+        if not self.cache_path:
+            return
+
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        with open(f"{self.cache_path}.tmp", "w") as file:
+            json.dump(self.cache, file, ensure_ascii=False)
+        os.replace(f"{self.cache_path}.tmp", self.cache_path)
+
+
+def get_most_freq_words(
+    data: pd.DataFrame, index: "FrequencyIndex" = None, k: int = 30
+) -> Tuple[List, List[int]]:
     """
     Получение списка самых используемых слов в корпусе отзывов
     :param data: dataframe
+    :param index: частотный словарь корпуса (если уже построен)
+    :param k: количество слов
     :return words: список слов топ-30 слов
     :return count: количество употреблений слов в корпусе
     """
-    punctuation_marks = [
-        "!",
-        ",",
-        "(",
-        ")",
-        ":",
-        "-",
-        "?",
-        ".",
-        "..",
-        "...",
-        "«",
-        "»",
-        ";",
-        "–",
-        "--",
-    ]
-
-    # Корпус всех отзывов (без учета стоп-слов)
-    corpus = [
-        [
-            word
-            for word in rev.split()
-            if word not in punctuation_marks and len(word) > 3
-        ]
-        for rev in data.reviewText.tolist()
-    ]
-
-    # Словарь корпуса
-    counter = Counter(chain(*corpus))
-
-    # Отсортированные по убыванию пары словаря (слово - количество употреблений в корпусе)
-    most = counter.most_common()
-
-    words = []
-    count = []
+    # Модуль частотного словаря использует пул процессов этого модуля
+    from .freq_index import build_frequency_index
+
+    if index is None:
+        index = build_frequency_index(data.reviewText.tolist())
 
     # 30 самых часто встречаемых слов в словаре
-    for term in most[:30]:
-        words.append(term[0])
-        count.append(term[1])
-    return words, count
+    return index.top_k(k)
@@ -0,0 +1,143 @@
+"""
+Программа хранения токенизированных датасетов на диске в виде
+отображаемых в память массивов
+Версия 1.0
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Компактные типы хранения: идентификаторы токенов помещаются в int32,
+# маска внимания и тип сегмента - в uint8
+DTYPES = {
+    "input_ids": np.int32,
+    "attention_mask": np.uint8,
+    "token_type_ids": np.uint8,
+}
+
+
+def get_cache_key(texts: List[str], tokenizer_id: str, max_length: int) -> str:
+    """
+    Ключ кэша по очищенным текстам, токенизатору и максимальной длине
+    :param texts: очищенные тексты отзывов
+    :param tokenizer_id: идентификатор токенизатора
+    :param max_length: максимальная длина последовательности
+    :return: ключ
+    """
+    digest = hashlib.sha1(f"{tokenizer_id}\0{max_length}".encode("utf-8"))
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+def load_encodings(cache_dir: str, key: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Открытие сохраненных массивов без чтения в память
+    :param cache_dir: директория кэша
+    :param key: ключ кэша
+    :return: словарь массивов или None, если запись отсутствует
+    """
+    path = os.path.join(cache_dir, key)
+    if not os.path.isdir(path):
+        return None
+
+    # Режим copy-on-write: срезы массивов доступны для записи без копирования файла
+    return {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="c")
+        for name in DTYPES
+    }
+
+
+@contextmanager
+def save_encodings(
+    cache_dir: str, key: str, n_rows: int, max_length: int
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Сохранение токенизированного датасета в компактных типах: создаются файлы
+    массивов [n_rows, max_length], отображаемые в память, токенизатор
+    записывает результат прямо в них. Запись появляется в кэше после выхода
+    из блока with без ошибок
+    :param cache_dir: директория кэша
+    :param key: ключ кэша
+    :param n_rows: количество отзывов
+    :param max_length: максимальная длина последовательности
+    :return: словарь массивов input_ids, attention_mask, token_type_ids
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=cache_dir)
+
+    try:
+        arrays = {
+            name: np.lib.format.open_memmap(
+                os.path.join(tmp_path, f"{name}.npy"),
+                mode="w+",
+                dtype=dtype,
+                shape=(n_rows, max_length),
+            )
+            for name, dtype in DTYPES.items()
+        }
+        yield arrays
+        for array in arrays.values():
+            array.flush()
+    except BaseException:
+        shutil.rmtree(tmp_path)
+        raise
+
+    # Запись появляется в кэше целиком, параллельные запуски не увидят ее частично
+    try:
+        os.rename(tmp_path, os.path.join(cache_dir, key))
+    except OSError:
+        shutil.rmtree(tmp_path)
+
+
+def load_packed(cache_dir: str, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Открытие сохраненных последовательностей без дополнения
+    :param cache_dir: директория кэша
+    :param key: ключ кэша
+    :return: идентификаторы токенов всех отзывов подряд и смещения начала
+    каждого отзыва или None, если запись отсутствует
+    """
+    path = os.path.join(cache_dir, f"{key}-packed")
+    if not os.path.isdir(path):
+        return None
+
+    return (
+        np.load(os.path.join(path, "input_ids.npy"), mmap_mode="r"),
+        np.load(os.path.join(path, "offsets.npy")),
+    )
+
+
+def save_packed(cache_dir: str, key: str, sequences: List[List[int]]) -> None:
+    """
+    Сохранение токенизированного датасета без дополнения: последовательности
+    записываются подряд, границы отзывов задаются массивом смещений
+    :param cache_dir: директория кэша
+    :param key: ключ кэша
+    :param sequences: идентификаторы токенов каждого отзыва
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=cache_dir)
+
+    offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+    np.cumsum([len(ids) for ids in sequences], out=offsets[1:])
+    input_ids = np.fromiter(
+        (token for ids in sequences for token in ids),
+        dtype=DTYPES["input_ids"],
+        count=offsets[-1],
+    )
+    np.save(os.path.join(tmp_path, "input_ids.npy"), input_ids)
+    np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+
+    try:
+        os.rename(tmp_path, os.path.join(cache_dir, f"{key}-packed"))
+    except OSError:
+        shutil.rmtree(tmp_path)
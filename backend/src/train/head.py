@@ -0,0 +1,144 @@
+"""
+Программа обучения только классификационной головы Bert на сохраненных
+выходах замороженного энкодера
+Версия 1.0
+"""
+
+import json
+from types import SimpleNamespace
+from typing import Dict
+
+import numpy as np
+import torch
+import transformers
+from sklearn.metrics import log_loss, roc_auc_score
+from transformers import TrainerControl, TrainerState
+
+from ..train.metrics import create_dict_metrics
+
+
+def get_pooled_outputs(
+    model: transformers.BertForSequenceClassification,
+    encodings: Dict[str, np.ndarray],
+    batch_size: int = 64,
+) -> np.ndarray:
+    """
+    Выходы пулера энкодера Bert (вход классификационной головы); батчи
+    формируются из отзывов близкой длины и обрезаются до самого длинного из них
+    :param model: модель классификации Bert
+    :param encodings: словарь массивов input_ids, attention_mask, token_type_ids
+    :param batch_size: размер батча
+    :return: матрица [число отзывов, размер скрытого слоя] в float16
+    """
+    lengths = np.asarray(encodings["attention_mask"]).sum(axis=1)
+    order = np.argsort(lengths, kind="stable")
+    pooled = np.empty((len(lengths), model.config.hidden_size), dtype=np.float16)
+
+    model.eval()
+    with torch.inference_mode():
+        for pos in range(0, len(order), batch_size):
+            idx = np.sort(order[pos : pos + batch_size])
+            length = max(int(lengths[idx].max()), 1)
+            batch = {
+                name: torch.from_numpy(
+                    np.asarray(array[idx, :length], dtype=np.int64)
+                )
+                for name, array in encodings.items()
+            }
+            pooled[idx] = model.bert(**batch).pooler_output.numpy()
+
+    return pooled
+
+
+def evaluate_head(
+    model: transformers.BertForSequenceClassification,
+    features: np.ndarray,
+) -> np.ndarray:
+    """
+    Вероятности классов по сохраненным выходам энкодера
+    :param model: модель классификации Bert
+    :param features: выходы пулера энкодера
+    :return: матрица вероятностей
+    """
+    model.eval()
+    with torch.inference_mode():
+        logits = model.classifier(torch.from_numpy(features).float())
+
+    return torch.softmax(logits, dim=-1).numpy()
+
+
+def train_head(
+    model: transformers.BertForSequenceClassification,
+    train_config: dict,
+    features: Dict[str, np.ndarray],
+    labels: Dict[str, list],
+    callbacks: list = None,
+) -> transformers.BertForSequenceClassification:
+    """
+    Обучение классификационной головы при замороженном энкодере: каждая
+    эпоха проходит только по линейному слою, без прямого прохода Bert
+    :param model: модель классификации Bert
+    :param train_config: конфигурационный файл
+    :param features: выходы пулера энкодера для выборок train/val/test
+    :param labels: метки классов для выборок train/val/test
+    :param callbacks: callbacks объекта Trainer для передачи прогресса
+    :return: модель с обученной головой
+    """
+    torch.manual_seed(train_config["random_state"])
+
+    for param in model.bert.parameters():
+        param.requires_grad = False
+
+    x_train = torch.from_numpy(features["train"]).float()
+    y_train = torch.tensor(labels["train"])
+    batch_size = train_config["per_device_batch_size"]
+    epochs = train_config["epochs"]
+    steps_per_epoch = -(-len(x_train) // batch_size)
+
+    optimizer = torch.optim.AdamW(
+        model.classifier.parameters(),
+        lr=train_config["head_learning_rate"],
+        weight_decay=train_config["weight_decay"],
+    )
+
+    # Прогресс передается через те же callbacks, что и при обучении Trainer
+    args = SimpleNamespace(num_train_epochs=epochs)
+    state = TrainerState(max_steps=steps_per_epoch * epochs)
+    control = TrainerControl()
+    history = {"auc": [], "eval_loss": []}
+
+    for _ in range(epochs):
+        model.train()
+        for batch in torch.randperm(len(x_train)).split(batch_size):
+            # Dropout перед головой, как в прямом проходе модели
+            logits = model.classifier(model.dropout(x_train[batch]))
+            loss = torch.nn.functional.cross_entropy(logits, y_train[batch])
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+
+            state.global_step += 1
+            state.epoch = state.global_step / steps_per_epoch
+            for callback in callbacks or []:
+                callback.on_step_end(args, state, control)
+
+        probs = evaluate_head(model, features["val"])
+        history["auc"].append(float(roc_auc_score(labels["val"], probs[:, 1])))
+        history["eval_loss"].append(float(log_loss(labels["val"], probs)))
+
+    # Сохранение метрик и логов обучения в тех же форматах, что и для Trainer
+    y_probability = evaluate_head(model, features["test"])
+    with open(train_config["metrics_path"], "w") as file:
+        json.dump(
+            create_dict_metrics(
+                y_test=labels["test"],
+                y_predict=np.argmax(y_probability, axis=1),
+                y_probability=y_probability,
+            ),
+            file,
+        )
+    with open(train_config["trainer_log_path"], "w") as json_file:
+        json.dump(history, json_file)
+
+    return model
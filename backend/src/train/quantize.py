@@ -0,0 +1,121 @@
+"""
+Программа динамической int8-квантизации обученной модели Bert
+Версия 1.0
+"""
+
+import io
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+import transformers
+from transformers import BertTokenizerFast
+
+from ..evaluate.inference import InferenceEngine
+from ..train.metrics import create_dict_metrics
+from ..train.train import model_load
+
+
+def quantize_model(
+    model: transformers.BertForSequenceClassification,
+) -> transformers.BertForSequenceClassification:
+    """
+    Динамическая int8-квантизация линейных слоев модели
+    :param model: обученная модель классификации Bert
+    :return: квантизованная модель
+    """
+    model.eval()
+
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def save_quantized_model(test_config: dict) -> None:
+    """
+    Квантизация сохраненной модели и сохранение отдельным артефактом
+    :param test_config: конфигурационный файл
+    """
+    model = quantize_model(model_load(test_config))
+
+    os.makedirs(os.path.dirname(test_config["quantized_model_path"]), exist_ok=True)
+    torch.save(model.state_dict(), test_config["quantized_model_path"])
+
+
+def load_quantized_model(
+    test_config: dict,
+) -> transformers.BertForSequenceClassification:
+    """
+    Загрузка квантизованной модели: архитектура и метки классов берутся
+    из сохраненной модели, веса - из квантизованного артефакта
+    :param test_config: конфигурационный файл
+    :return: квантизованная модель классификации Bert
+    """
+    model = quantize_model(model_load(test_config))
+    model.load_state_dict(torch.load(test_config["quantized_model_path"]))
+
+    return model
+
+
+def get_model_size(model: torch.nn.Module) -> float:
+    """
+    Размер сериализованных весов модели
+    :param model: модель
+    :return: размер в мегабайтах
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+
+    return round(buffer.getbuffer().nbytes / 2**20, 2)
+
+
+def save_quantization_report(config: dict, test_data: pd.DataFrame) -> None:
+    """
+    Сравнение квантизованной модели с исходной по размеру, времени
+    предсказания и метрикам на тестовой выборке с сохранением отчета
+    :param config: конфигурационный словарь
+    :param test_data: предобработанный тестовый датасет
+    """
+    train_config = config["train"]
+    test_config = config["test"]
+
+    tokenizer = BertTokenizerFast.from_pretrained(train_config["tokenizer_path"])
+    texts = test_data.reviewText.tolist()
+
+    report = {}
+    models = {
+        "fp32": model_load(test_config).eval(),
+        "int8": load_quantized_model(test_config).eval(),
+    }
+    for name, model in models.items():
+        engine = InferenceEngine(
+            model,
+            tokenizer,
+            max_length=train_config["max_length"],
+            batch_size=test_config["inference_batch_size"],
+        )
+
+        start = time.perf_counter()
+        y_probability = engine.predict_proba(texts)
+        latency = time.perf_counter() - start
+
+        report[name] = {
+            "size_mb": get_model_size(model),
+            "latency_sec": round(latency, 3),
+            **create_dict_metrics(
+                y_test=test_data.target.tolist(),
+                y_predict=np.argmax(y_probability, axis=1),
+                y_probability=y_probability,
+            ),
+        }
+
+    report["delta"] = {
+        key: round(report["int8"][key] - report["fp32"][key], 3)
+        for key in ["size_mb", "latency_sec", "roc_auc", "f1"]
+    }
+
+    with open(test_config["quantization_report_path"], "w") as file:
+        json.dump(report, file)
@@ -4,10 +4,17 @@
 """
 import torch
 import transformers
+from torch.utils.data import DataLoader
 from transformers import BertForSequenceClassification, Trainer, TrainingArguments
 
 from ..train.metrics import compute_metrics, save_metrics
-from ..tokenize.bert_embeddings import CustomDataset
+from ..tokenize.bert_embeddings import (
+    CustomDataset,
+    PackedDataset,
+    TokenBudgetBatchSampler,
+    DynamicPaddingCollator,
+    EncodingsCollator,
+)
 import json
 
 
@@ -24,20 +31,46 @@ def get_device():
     return device
 
 
+class TokenBudgetTrainer(Trainer):
+    """
+    Trainer, формирующий обучающие батчи сэмплером по бюджету токенов
+    """
+
+    def __init__(self, *args, batch_sampler: TokenBudgetBatchSampler = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_sampler = batch_sampler
+
+    def get_train_dataloader(self) -> DataLoader:
+        if self.batch_sampler is None:
+            return super().get_train_dataloader()
+
+        dataloader = DataLoader(
+            self.train_dataset,
+            batch_sampler=self.batch_sampler,
+            collate_fn=self.data_collator,
+            num_workers=self.args.dataloader_num_workers,
+        )
+
+        return self.accelerator.prepare(dataloader)
+
+
 def bert_training(
     train_config: dict,
     train_dataset: CustomDataset,
     eval_dataset: CustomDataset,
     test_dataset: CustomDataset,
     requires_grad: bool = False,
+    callbacks: list = None,
 ) -> transformers.Trainer:
     """
     Обучение модели Bert
     :param train_config: конфигурационный файл
-    :param train_dataset: датасет для обучения
+    :param train_dataset: датасет для обучения; для PackedDataset батчи
+    формируются по бюджету токенов и дополняются до самого длинного отзыва
     :param eval_dataset: датасет для предсказания на валидационный выборке
     :param test_dataset: тестовый датасет для оценки метрик
     :param requires_grad: обновление весовых коэффициентов
+    :param callbacks: дополнительные callbacks для объекта Trainer
     :return Trainer, включающий в себя обученную модель
     """
 
@@ -63,12 +96,26 @@ def bert_training(
     # Перенос вычислений модели на GPU
     model.to(get_device())
 
-    trainer = Trainer(
+    # Последовательности без дополнения: батчи по бюджету токенов,
+    # дополнение выполняется для каждого батча отдельно
+    batch_sampler, data_collator = None, EncodingsCollator()
+    if isinstance(train_dataset, PackedDataset):
+        batch_sampler = TokenBudgetBatchSampler(
+            train_dataset.lengths,
+            max_tokens=train_config["token_budget"],
+            random_state=train_config["random_state"],
+        )
+        data_collator = DynamicPaddingCollator(model.config.pad_token_id)
+
+    trainer = TokenBudgetTrainer(
         model=model,
         args=args,
         train_dataset=train_dataset,
         eval_dataset=eval_dataset,
+        data_collator=data_collator,
         compute_metrics=compute_metrics,
+        callbacks=callbacks,
+        batch_sampler=batch_sampler,
     )
     # Обучение
     trainer.train()
@@ -92,6 +139,14 @@ def save_model(trainer: transformers.Trainer, test_config: dict) -> None:
     # Сохранение модели
     trainer.save_model(test_config["model_path"])
 
+    save_label_names(test_config)
+
+
+def save_label_names(test_config: dict) -> None:
+    """
+    Запись названий классов в конфигурацию сохраненной модели
+    :param test_config: конфигурационный файл
+    """
     # Изменение название классов
     id2label = {"0": "Negative", "1": "Positive"}
     label2id = {"Negative": 0, "Positive": 1}
@@ -106,6 +161,33 @@ def save_model(trainer: transformers.Trainer, test_config: dict) -> None:
         json_file.truncate()
 
 
+def export_onnx(test_config: dict) -> None:
+    """
+    Экспорт сохраненной модели в формат ONNX с динамическими осями батча
+    и длины последовательности
+    :param test_config: конфигурационный файл
+    """
+    model = model_load(test_config)
+    model.eval()
+
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    # Пример входа для трассировки модели, размеры осей задаются динамическими
+    input_ids = torch.ones((2, 16), dtype=torch.long)
+
+    torch.onnx.export(
+        model,
+        (input_ids, torch.ones_like(input_ids), torch.zeros_like(input_ids)),
+        test_config["onnx_path"],
+        input_names=input_names,
+        output_names=["logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=14,
+    )
+
+
 def model_load(test_config: dict) -> transformers.BertForSequenceClassification:
     """
     Загрузка обученной модели
@@ -4,10 +4,13 @@
 """
 
 import pandas as pd
-from ..tokenize.text_processing import clean_text
+from ..tokenize.text_processing import clean_texts
 from typing import Union
 import numpy as np
 
+# Количество значений, по которым определяется тип столбца
+SAMPLE_SIZE = 1000
+
 
 def transform_labels(data: pd.DataFrame) -> pd.DataFrame:
     """
@@ -20,6 +23,22 @@ def transform_labels(data: pd.DataFrame) -> pd.DataFrame:
     return data
 
 
+def is_text_column(column: pd.Series, sample_size: int = SAMPLE_SIZE) -> bool:
+    """
+    Определение текстового столбца по выборке значений, а не по всему столбцу
+    :param column: столбец датасета
+    :param sample_size: размер выборки
+    :return: True, если столбец содержит строки
+    """
+    if column.dtype not in [str, object] and not pd.api.types.is_string_dtype(column):
+        return False
+
+    return pd.api.types.infer_dtype(column.head(sample_size), skipna=True) in [
+        "string",
+        "empty",
+    ]
+
+
 def check_data(data: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.Series]:
     """
     Проверка датасета на названия, количество столбцов и типы данных в них содержащихся
@@ -28,7 +47,7 @@ def check_data(data: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.S
     """
     # Если Series - проверить тип данных
     if isinstance(data, pd.Series):
-        if data.dtype in [str, object]:
+        if is_text_column(data):
             data = pd.DataFrame(data, columns=["reviewText"])
             return data
         else:
@@ -42,7 +61,7 @@ def check_data(data: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.S
         # Если датасет содержит другие названия столбцов - проверить тип данных
         elif len(cols) == 2:
             for col in cols:
-                if data[col].dtype in [str, object]:
+                if is_text_column(data[col]):
                     data["reviewText"] = data[col]
 
                 elif data[col].dtype in [int, np.int32, np.int64, "int32", "int64"]:
@@ -60,7 +79,7 @@ def check_data(data: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.S
 
         elif len(cols) == 1:
             data.columns = ["reviewText"]
-            if data["reviewText"].dtype in [str, object]:
+            if is_text_column(data["reviewText"]):
                 return data
             else:
                 raise TypeError("Неверный формат данных.")
@@ -85,7 +104,7 @@ def pipeline_preprocess(
     """
 
     data = check_data(data)
-    data["reviewText"] = data.reviewText.transform(lambda x: clean_text(x))
+    data["reviewText"] = clean_texts(data.reviewText)
 
     if flg2eval:
         data = data["reviewText"]
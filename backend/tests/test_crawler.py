@@ -0,0 +1,233 @@
+"""
+Тесты загрузки страниц на локальном тестовом HTTP-сервере: порядок страниц,
+повторы при ответах 429/503, ограничение частоты запросов
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import yaml
+
+from src.data.crawler import Crawler, TokenBucket
+from src.data.get_reviews import iter_reviews, parse_pool
+from src.data.parsing import parse_review_text
+
+CONFIG_PATH = Path(__file__).resolve().parents[2] / "config" / "config.yaml"
+
+
+class StubServer:
+    """
+    Тестовый сервер: для каждого пути задается список ответов
+    (код, заголовки, текст), последний ответ повторяется
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append((time.monotonic(), self.path))
+                    responses = stub.routes.get(self.path, [(404, {}, "")])
+                    status, headers, body = (
+                        responses.pop(0) if len(responses) > 1 else responses[0]
+                    )
+
+                content = body.encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"http://127.0.0.1:{self.server.server_port}"
+
+    def paths(self) -> list:
+        with self.lock:
+            return [path for _, path in self.requests]
+
+    def times(self, path: str) -> list:
+        with self.lock:
+            return [moment for moment, request in self.requests if request == path]
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    thread = threading.Thread(target=server.server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+def make_crawler(**params) -> Crawler:
+    params = {"rate": 1000.0, "burst": 1000, "backoff": 0.01, **params}
+    return Crawler(headers={}, cookies={}, **params)
+
+
+def listing_page(hrefs: list) -> str:
+    links = "".join(
+        f'<a class="review-btn review-read-link" href="{href}">Читать</a>'
+        for href in hrefs
+    )
+    return f"<html><body>{links}</body></html>"
+
+
+def review_page(text: str) -> str:
+    return f'<html><body><div class="review-body description">{text}</div></body></html>'
+
+
+def test_fetch_returns_page(stub):
+    stub.routes["/page"] = [(200, {}, "текст страницы")]
+
+    assert make_crawler().fetch(f"{stub.host}/page") == "текст страницы"
+    assert stub.paths() == ["/page"]
+
+
+def test_fetch_retries_429_and_503(stub):
+    stub.routes["/page"] = [
+        (429, {"Retry-After": "1"}, ""),
+        (503, {}, ""),
+        (200, {}, "ok"),
+    ]
+
+    assert make_crawler(max_retries=3).fetch(f"{stub.host}/page") == "ok"
+
+    first, second, third = stub.times("/page")
+    # Задержка из Retry-After, затем экспоненциальная задержка backoff
+    assert second - first >= 0.95
+    assert third - second < 0.5
+
+
+def test_fetch_gives_up_after_max_retries(stub):
+    stub.routes["/page"] = [(503, {}, "")]
+
+    with pytest.raises(ConnectionError):
+        make_crawler(max_retries=2).fetch(f"{stub.host}/page")
+
+    assert stub.paths() == ["/page"] * 3
+
+
+def test_fetch_does_not_retry_other_statuses(stub):
+    stub.routes["/page"] = [(404, {}, ""), (200, {}, "ok")]
+
+    with pytest.raises(ConnectionError):
+        make_crawler(max_retries=3).fetch(f"{stub.host}/page")
+
+    assert stub.paths() == ["/page"]
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+
+    # Первый токен доступен сразу, остальные 10 - по 1/20 секунды
+    assert time.monotonic() - start >= 0.45
+
+
+def test_crawler_holds_rate_across_threads(stub):
+    for i in range(11):
+        stub.routes[f"/page/{i}"] = [(200, {}, "ok")]
+    crawler = make_crawler(concurrency=8, rate=10.0, burst=1)
+
+    threads = [
+        threading.Thread(target=crawler.fetch, args=(f"{stub.host}/page/{i}",))
+        for i in range(11)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    times = sorted(moment for moment, _ in stub.requests)
+    assert len(times) == 11
+    assert times[-1] - times[0] >= 0.9
+
+
+def test_parse_pool_recovers_after_worker_crash():
+    # Аварийное завершение процесса разбора страниц
+    with pytest.raises(BrokenProcessPool):
+        parse_pool.submit(os._exit, 1, max_workers=1).result()
+
+    page = review_page("Отзыв")
+    assert parse_pool.submit(parse_review_text, page, max_workers=1).result() == "Отзыв"
+    # Пул создается заново при изменении количества процессов
+    assert parse_pool.get(max_workers=2) is not parse_pool.get(max_workers=1)
+
+
+def test_iter_reviews_in_page_order(stub, tmp_path):
+    pages = {1: ["a", "b"], 2: ["c", "a"], 3: ["d", "e"]}
+    for page, names in pages.items():
+        stub.routes[f"/reviews/shop/{page}/"] = [
+            (200, {}, listing_page([f"/review_{name}.html" for name in names]))
+        ]
+    for name in "abcde":
+        stub.routes[f"/review_{name}.html"] = [(200, {}, review_page(f"Отзыв {name}"))]
+    # Повтор страницы отзыва после ответа 429
+    stub.routes["/review_d.html"].insert(0, (429, {"Retry-After": "0"}, ""))
+
+    with open(CONFIG_PATH) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+    connection_path = tmp_path / "connection.json"
+    connection_path.write_text(
+        json.dumps({"HOST": stub.host, "cookies": {}, "headers": {}})
+    )
+    config["preprocessing"].update(
+        connection_path=str(connection_path),
+        scrape_path=str(tmp_path / "scrape_data.csv"),
+        scrape_cache_dir=str(tmp_path / "http"),
+        scrape_checkpoint_path=str(tmp_path / "checkpoint.db"),
+        scrape_freq_index_path=str(tmp_path / "scrape_freq.json"),
+        scrape_backoff=0.01,
+    )
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.dump(config))
+
+    url = f"{stub.host}/reviews/shop/1/"
+    results = list(iter_reviews(str(config_path), url, page_count=3))
+
+    # Отзыв "a" со второй страницы уже собран с первой
+    assert results == [
+        (1, 3, ["Отзыв a", "Отзыв b"]),
+        (2, 3, ["Отзыв c"]),
+        (3, 3, ["Отзыв d", "Отзыв e"]),
+    ]
+    # Страницы списка загружаются до страниц отзывов, каждая один раз
+    paths = stub.paths()
+    listing = [i for i, path in enumerate(paths) if path.startswith("/reviews/")]
+    assert sorted(paths[i] for i in listing) == [
+        "/reviews/shop/1/",
+        "/reviews/shop/2/",
+        "/reviews/shop/3/",
+    ]
+    assert max(listing) < min(
+        i for i, path in enumerate(paths) if path.startswith("/review_")
+    )
+    assert paths.count("/review_a.html") == 1
+    assert paths.count("/review_d.html") == 2
+
+    # Повторный запуск пропускает обработанные страницы
+    assert list(iter_reviews(str(config_path), url, page_count=3)) == []
+    assert (tmp_path / "scrape_data.csv").read_text(encoding="utf-8").split(
+        "\n"
+    )[:6] == ["reviewText", "Отзыв a", "Отзыв b", "Отзыв c", "Отзыв d", "Отзыв e"]
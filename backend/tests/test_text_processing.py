@@ -0,0 +1,97 @@
+"""
+Тесты очистки текста: совпадение пакетной очистки с clean_text
+на исходных данных data/raw, определение текстовых столбцов
+"""
+
+from pathlib import Path
+
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tokenize.text_processing import (
+    ProcessPool,
+    clean_series,
+    clean_text,
+    clean_texts,
+)
+from src.transform.transform import check_data, is_text_column
+
+RAW_DIR = Path(__file__).resolve().parents[2] / "data" / "raw"
+RAW_FILES = sorted(RAW_DIR.glob("*.csv"))
+
+
+@pytest.fixture(params=RAW_FILES, ids=[path.name for path in RAW_FILES])
+def reviews(request) -> pd.Series:
+    return pd.read_csv(request.param).reviewText.dropna().astype(str)
+
+
+@pytest.mark.parametrize("parallel", [False, True], ids=["serial", "parallel"])
+def test_clean_texts_matches_clean_text(reviews, parallel):
+    # Малый порог - очистка в пуле процессов, большой - в текущем процессе
+    threshold = 2 if parallel else len(reviews) + 1
+
+    expected = reviews.transform(clean_text)
+    result = clean_texts(reviews, parallel_threshold=threshold)
+
+    pd.testing.assert_series_equal(result, expected, check_dtype=False)
+
+
+def test_clean_texts_edge_cases():
+    texts = pd.Series(
+        ["", "   ", "Hello 123 😊", "Привет,мир!!", "ЁЖИК  ёжик", "Да?Нет.Может..."],
+        index=[5, 3, 1, 0, 2, 4],
+    )
+
+    pd.testing.assert_series_equal(
+        clean_texts(texts), texts.transform(clean_text), check_dtype=False
+    )
+
+
+def test_process_pool_recovers_after_worker_crash(reviews):
+    pool = ProcessPool()
+    parts = [reviews.iloc[:100], reviews.iloc[100:200]]
+
+    # Аварийное завершение процесса пула
+    with pytest.raises(BrokenProcessPool):
+        pool.map(os._exit, [1], max_workers=2)
+
+    result = pool.map(clean_series, parts, max_workers=2)
+    pd.testing.assert_series_equal(
+        pd.concat(result), pd.concat(parts).transform(clean_text), check_dtype=False
+    )
+    assert pool.get(max_workers=2) is pool.get(max_workers=2)
+
+
+def test_is_text_column_on_raw_data(reviews):
+    assert is_text_column(reviews)
+    assert not is_text_column(pd.Series(np.arange(len(reviews))))
+
+
+def test_is_text_column_uses_sample():
+    column = pd.Series(["отзыв"] * 5 + [1], dtype=object)
+
+    assert is_text_column(column, sample_size=5)
+    assert not is_text_column(column, sample_size=6)
+
+
+def test_check_data_series(reviews):
+    data = check_data(reviews)
+
+    assert list(data.columns) == ["reviewText"]
+    assert len(data) == len(reviews)
+
+    with pytest.raises(TypeError):
+        check_data(pd.Series([1, 2, 3]))
+
+
+def test_check_data_renames_columns(reviews):
+    data = pd.DataFrame({"text": reviews.values, "score": 5})
+    data = check_data(data)
+
+    assert list(data.columns) == ["reviewText", "label"]
+    assert data.label.dtype.kind == "i"
+    assert data.reviewText.tolist() == reviews.tolist()
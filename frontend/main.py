@@ -4,9 +4,15 @@ import os
 
 from src.train.training import start_training
 from src.evaluate.evaluate import start_evaluate, start_evaluate_from_file
-from src.data.get_data import load_data, get_eda_stats
+from src.data.get_data import (
+    load_data,
+    get_eda_version,
+    get_eda_preview,
+    get_eda_aggregates,
+    get_most_freq_words,
+)
 from src.data.get_reviews import start_scraping
-from src.plotting.charts import plot_bars, plot_boxplot, plot_kdeplot, plot_barplot
+from src.plotting.render import render_plot
 
 CONFIG_PATH = "../config/config.yaml"
 
@@ -56,10 +62,46 @@ def exploratory():
     st.markdown("# Exploratory data analysis")
     with open(CONFIG_PATH) as file:
         config = yaml.load(file, Loader=yaml.FullLoader)
-    endpoint = config["endpoints"]["exploratory"]
+    endpoints = config["endpoints"]
 
-    data, words, count = get_eda_stats(endpoint=endpoint)
-    st.write(data.head())
+    # Запросы и графики кэшируются по версии данных: при изменении
+    # обучающего датасета меняется версия и все пересчитывается
+    version = get_eda_version(endpoint=endpoints["eda_version"])
+
+    # Статистики вычисляются на сервере, в браузер передаются только агрегаты
+    aggregates = get_eda_aggregates(
+        endpoint=endpoints["eda_aggregates"], version=version
+    )
+    features = aggregates["features"]
+    st.write(f"Количество отзывов: {aggregates['n_rows']}")
+    st.write(get_eda_preview(endpoint=endpoints["exploratory"], version=version))
+
+    def show_box(feature: str, plot_name: str, **params) -> None:
+        st.image(
+            render_plot(
+                "box",
+                version,
+                feature,
+                (features[feature]["box"],),
+                plot_name=plot_name,
+                **params,
+            ),
+            use_column_width=True,
+        )
+
+    def show_kde(feature: str, plot_name: str, **params) -> None:
+        st.image(
+            render_plot(
+                "kde",
+                version,
+                feature,
+                (features[feature]["kde"],),
+                col_name=feature,
+                plot_name=plot_name,
+                **params,
+            ),
+            use_column_width=True,
+        )
 
     review_stats = st.sidebar.checkbox("Статистика отзывов")
     count_word_sent = st.sidebar.checkbox("Количество слов и предложений в отзывах")
@@ -69,10 +111,8 @@ def exploratory():
     most_freq = st.sidebar.checkbox("Наиболее часто встречающиеся слова")
 
     if review_stats:
-        st.pyplot(
-            plot_bars(
-                data=data,
-            )
+        st.image(
+            render_plot("bars", version, "target", (aggregates["class_balance"],))
         )
         st.write(
             "В датасете присутсвует дисбаланс классов в сторону негативных отзывов."
@@ -81,18 +121,10 @@ def exploratory():
     if count_word_sent:
         col1, col2 = st.columns([0.5, 0.5])
         with col1:
-            st.pyplot(
-                plot_boxplot(data, "Words_count", "target", "Количество слов"),
-                use_container_width=True,
-            )
+            show_box("Words_count", "Количество слов")
 
         with col2:
-            st.pyplot(
-                plot_boxplot(
-                    data, "Sentences_count", "target", "Количество предложений"
-                ),
-                use_container_width=True,
-            )
+            show_box("Sentences_count", "Количество предложений")
         st.write(
             "Негативные отзывы содержат больше слов и предложений, что кажется логичным: человек, "
             "довольный опытом покупки, отзыв либо не оставляет, либо делает это лаконично."
@@ -103,27 +135,12 @@ def exploratory():
     if review_length:
         col1, col2 = st.columns([0.5, 0.5])
         with col1:
-            st.pyplot(
-                plot_boxplot(
-                    data,
-                    width=4,
-                    height=5,
-                    col_name="Review_length",
-                    hue_name="target",
-                    plot_name="Длина отзыва (количество символов)",
-                ),
-                use_container_width=True,
+            show_box(
+                "Review_length", "Длина отзыва (количество символов)", width=4, height=5
             )
         with col2:
-            st.pyplot(
-                plot_kdeplot(
-                    data,
-                    width=4,
-                    height=5,
-                    col_name="Review_length",
-                    hue_name="target",
-                    plot_name="Длина отзыва (количество символов)",
-                )
+            show_kde(
+                "Review_length", "Длина отзыва (количество символов)", width=4, height=5
             )
 
         st.write(
@@ -134,42 +151,32 @@ def exploratory():
     if mean_word_len:
         col1, col2 = st.columns([0.5, 0.5])
         with col1:
-            st.pyplot(
-                plot_boxplot(data, "Mean_word_length", "target", "Средняя длина слов"),
-                use_container_width=True,
-            )
+            show_box("Mean_word_length", "Средняя длина слов")
 
         with col2:
-            st.pyplot(
-                plot_kdeplot(data, "Mean_word_length", "target", "Средняя длина слов"),
-                use_container_width=True,
-            )
+            show_kde("Mean_word_length", "Средняя длина слов")
         st.write(
             "Средняя длина слова в позитивном отзыве чуть больше чем в негативном."
         )
     if mean_sent_len:
         col1, col2 = st.columns([0.5, 0.5])
         with col1:
-            st.pyplot(
-                plot_boxplot(
-                    data, "Mean_sentence_length", "target", "Средняя длина предложений"
-                ),
-                use_container_width=True,
-            )
+            show_box("Mean_sentence_length", "Средняя длина предложений")
 
         with col2:
-            st.pyplot(
-                plot_kdeplot(
-                    data, "Mean_sentence_length", "target", "Средняя длина предложений"
-                ),
-                use_container_width=True,
-            )
+            show_kde("Mean_sentence_length", "Средняя длина предложений")
         st.write(
             "Визуальной разницы в длинах предложений отзывов, в разрезе целевой переменной, нет."
         )
 
     if most_freq:
-        st.pyplot(plot_barplot(y=words, x=count), use_container_width=True)
+        words, count = get_most_freq_words(
+            endpoint=endpoints["most_freq_words"], version=version
+        )
+        st.image(
+            render_plot("words", version, "top_words", (words, count)),
+            use_column_width=True,
+        )
 
         st.write(
             "В топ-30 попали разные формы слов, касаемых непосредственно процесса покупки товаров, слов. "
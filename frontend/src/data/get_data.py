@@ -5,31 +5,79 @@
 
 import streamlit as st
 
-from io import BytesIO, StringIO
+from io import BytesIO
 import io
 import requests
-import json
 import pandas as pd
+import pyarrow.parquet as pq
 from typing import Dict, Tuple
 
 
-@st.cache_data
-def get_eda_stats(endpoint: object) -> Tuple[pd.DataFrame, list, list]:
+# Время жизни закэшированной версии данных, секунды
+VERSION_TTL = 5
+# Количество хранимых версий данных EDA
+MAX_VERSIONS = 4
+
+
+@st.cache_data(ttl=VERSION_TTL, show_spinner=False)
+def get_eda_version(endpoint: object) -> str:
     """
-    Кэширование результатов запроса датафрейма и списка топ-30 слов для визуализации данных
-    :param endpoint: endpount
-    :return data: датафрейм для EDA
-    :return words: список топ-30 слов
-    :return count: количество употребления слов в корпусе
+    Версия данных для EDA (отпечаток обучающего датасета) - ключ кэша
+    для запросов данных и построенных графиков
+    :param endpoint: endpoint
+    :return: версия
+    """
+    response = requests.get(endpoint, timeout=60)
+    response.raise_for_status()
+
+    return response.json()["version"]
+
+
+@st.cache_data(max_entries=MAX_VERSIONS)
+def get_eda_preview(endpoint: object, version: str, rows: int = 5) -> pd.DataFrame:
+    """
+    Кэширование первых строк датафрейма для EDA (в формате parquet)
+    :param endpoint: endpoint
+    :param version: версия данных для EDA
+    :param rows: количество строк
+    :return data: первые строки датафрейма для EDA
+    """
+    response = requests.post(
+        endpoint, params={"format": "parquet", "rows": rows}, timeout=8000
+    )
+    response.raise_for_status()
+
+    return pq.read_table(BytesIO(response.content)).to_pandas()
+
+
+@st.cache_data(max_entries=MAX_VERSIONS)
+def get_eda_aggregates(endpoint: object, version: str) -> dict:
     """
-    response = requests.post(endpoint, timeout=8000)
-    data_csv = StringIO(response.json()["data_csv"])
+    Кэширование агрегатов для графиков EDA, вычисленных на сервере
+    :param endpoint: endpoint
+    :param version: версия данных для EDA
+    :return: словарь агрегатов
+    """
+    response = requests.get(endpoint, timeout=8000)
+    response.raise_for_status()
+
+    return response.json()
 
-    words = json.loads(response.json()["words"])
-    count = json.loads(response.json()["count"])
-    data = pd.read_csv(data_csv)
 
-    return data, words, count
+@st.cache_data(max_entries=MAX_VERSIONS)
+def get_most_freq_words(endpoint: object, version: str, k: int = 30) -> Tuple[list, list]:
+    """
+    Кэширование списка самых частых слов обучающего датасета
+    :param endpoint: endpoint
+    :param version: версия данных для EDA
+    :param k: количество слов
+    :return words: список топ-k слов
+    :return count: количество употребления слов в корпусе
+    """
+    response = requests.get(endpoint, params={"k": k}, timeout=8000)
+    response.raise_for_status()
+
+    return response.json()["words"], response.json()["count"]
 
 
 def load_data(
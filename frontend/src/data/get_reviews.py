@@ -3,10 +3,16 @@
 Версия: 1.0
 """
 
+import json
+import os
+
 import pandas as pd
 import streamlit as st
 import requests
 
+from ..jobs.polling import wait_for_job
+from ..plotting.charts import create_sentiment_plot
+
 
 def start_scraping(config: dict, endpoint: object) -> None:
     """
@@ -27,27 +33,47 @@ def start_scraping(config: dict, endpoint: object) -> None:
             value=3,
             step=1,
         )
+        classify = st.checkbox("Классифицировать отзывы по мере получения")
         submit = st.form_submit_button("Get data")
         st.write("Например: https://otzovik.com/reviews/ozon_ru_online_shop/200/")
 
+    if submit and classify:
+        stream_scrape_predictions(
+            config["endpoints"]["scrape_predict"],
+            {"url": url, "page_count": page},
+        )
+        return
+
     if submit:
         with st.spinner("Getting data..."):
             try:
                 data = {"url": url, "page_count": page}
-                response = requests.post(endpoint, timeout=8000, json=data)
+                response = requests.post(endpoint, timeout=60, json=data)
                 response.raise_for_status()
+                job = wait_for_job(
+                    config["endpoints"]["jobs"], response.json()["job_id"]
+                )
+                if job["status"] == "failed":
+                    st.error(job["error"])
+                    return
+
                 st.write(
                     "Парсинг успешно завершен."
                     " Для выполнения предсказания перейдите"
                     "в раздел Prediction from file"
                 )
-                df = pd.read_csv(config["preprocessing"]["scrape_path"])
+                # Новые отзывы дописываются в общий файл собранных отзывов
+                result = job["result"]
+                st.write(f"Новых отзывов: {result['reviews']}")
+                if not os.path.exists(result["path"]):
+                    return
+                df = pd.read_csv(result["path"])
                 st.write(df.head())
                 csv = df.to_csv(index=False)
                 st.download_button(
                     label="Download File",
                     data=csv,
-                    file_name="sparse_dataframe.csv",
+                    file_name=os.path.basename(result["path"]),
                     mime="text/csv",
                 )
 
@@ -57,3 +83,63 @@ def start_scraping(config: dict, endpoint: object) -> None:
                     st.error(error_msg)
                 else:
                     st.error("Ошибка парсинга")
+
+
+def stream_scrape_predictions(endpoint: object, data: dict) -> None:
+    """
+    Парсинг с классификацией отзывов по мере получения: предсказания
+    и статистика обновляются после каждой обработанной страницы
+    :param endpoint: endpoint
+    :param data: URL-запрос и количество страниц
+    """
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
+    table = st.empty()
+    chart = st.empty()
+    rows = []
+
+    try:
+        with requests.post(endpoint, json=data, stream=True, timeout=8000) as response:
+            if response.status_code == 422:
+                st.error(response.json()["detail"])
+                return
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                record = json.loads(line)
+
+                if "prediction" in record:
+                    rows.append(record)
+                    continue
+
+                if "progress" in record:
+                    progress = record["progress"]
+                    progress_bar.progress(
+                        min(progress["pages_scraped"] / progress["page_count"], 1.0)
+                    )
+                    status_text.write(
+                        f"Страниц обработано: {progress['pages_scraped']} из "
+                        f"{progress['page_count']}, новых отзывов: {progress['reviews']}"
+                    )
+                else:
+                    progress_bar.progress(1.0)
+
+                table.dataframe(
+                    pd.DataFrame(rows, columns=["review", "prediction"]).tail(10)
+                )
+                chart.plotly_chart(
+                    create_sentiment_plot(
+                        record["stats"],
+                        width=500,
+                        height=600,
+                        title="Sentiment stats",
+                        xaxis="Sentiments",
+                        yaxis="Percent",
+                    ),
+                    use_container_width=True,
+                )
+
+    except requests.exceptions.RequestException:
+        st.error("Ошибка парсинга")
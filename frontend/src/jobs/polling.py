@@ -0,0 +1,50 @@
+"""
+Программа: Ожидание завершения фоновой задачи с отображением прогресса
+Версия: 1.0
+"""
+
+import time
+
+import requests
+import streamlit as st
+
+
+def wait_for_job(endpoint: object, job_id: str, poll_interval: float = 2.0) -> dict:
+    """
+    Опрос статуса фоновой задачи до ее завершения
+    :param endpoint: endpoint статуса задач
+    :param job_id: идентификатор задачи
+    :param poll_interval: интервал опроса в секундах
+    :return: словарь со статусом задачи
+    """
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
+
+    while True:
+        response = requests.get(f"{endpoint}/{job_id}", timeout=30)
+        response.raise_for_status()
+        job = response.json()
+        progress = job["progress"]
+
+        # Обучение: шаги оптимизатора, парсинг: обработанные страницы
+        if progress.get("max_steps"):
+            progress_bar.progress(min(progress["step"] / progress["max_steps"], 1.0))
+            status_text.write(
+                f"Эпоха {progress['epoch']} из {progress['num_epochs']}, "
+                f"шаг {progress['step']} из {progress['max_steps']}, "
+                f"прошло {job['elapsed']} с"
+            )
+        elif progress.get("page_count"):
+            progress_bar.progress(
+                min(progress["pages_scraped"] / progress["page_count"], 1.0)
+            )
+            status_text.write(
+                f"Страниц обработано: {progress['pages_scraped']} из "
+                f"{progress['page_count']}, отзывов: {progress['reviews']}, "
+                f"прошло {job['elapsed']} с"
+            )
+
+        if job["status"] in ("done", "failed"):
+            return job
+
+        time.sleep(poll_interval)
@@ -38,90 +38,80 @@ def plot_text(ax: plt.Axes) -> None:
         )
 
 
-def plot_bars(data: pd.DataFrame) -> matplotlib.figure.Figure:
+def plot_bars_stats(class_balance: dict) -> matplotlib.figure.Figure:
     """
-    Выводит столбчатую диаграмму для данных DataFrame.
-
-    :param: data: DataFrame с данными для построения столбчатой диаграммы
+    Столбчатая диаграмма распределения классов по агрегатам с сервера
+    :param class_balance: словарь "класс - доля в процентах"
     :return: fig
     """
-
-    sns.set_style("whitegrid")
-    # Вычисляем процентное распределение меток
-
-    norm_target = (
-        data["target"]
-        .value_counts(normalize=True)
-        .mul(100)
-        .rename("percent")
-        .reset_index()
+    norm_target = pd.DataFrame(
+        {"target": list(class_balance.keys()), "percent": list(class_balance.values())}
     )
 
+    sns.set_style("whitegrid")
     fig = plt.figure(figsize=(10, 7))
-    # Строим столбчатую диаграмму
     ax = sns.barplot(x="target", y="percent", data=norm_target, palette="viridis")
 
-    # Добавляем процентные значения к столбцам
     plot_text(ax)
-    # Устанавливаем заголовок графика
     ax.set_title("Оценки пользователей", fontsize=14)
-    # Устанавливаем подпись оси x
     ax.set_xlabel("Оценки пользователей", fontsize=12)
-    # Устанавливаем подпись оси y
     ax.set_ylabel("Доля в процентах", fontsize=12)
 
     return fig
 
 
-def plot_boxplot(
-    data, col_name: str, hue_name: str, plot_name: str, width: int = 4, height: int = 4
+def plot_boxplot_stats(
+    box_stats: dict, plot_name: str, width: int = 4, height: int = 4
 ) -> matplotlib.figure.Figure:
     """
-    Построение бокплота
-    :param data: датафрейм
-    :param col_name:
-    :param hue_name:
-    :param plot_name:
-    :param width:
-    :param height:
+    Построение бокплота по статистикам, вычисленным на сервере
+    :param box_stats: словарь "класс - статистики бокплота"
+    :param plot_name: название графика
+    :param width: ширина
+    :param height: высота
     :return: fig
     """
-
     sns.set_style("whitegrid")
-    fig = plt.figure(figsize=(width, height))
-    ax = sns.boxplot(data=data, y=col_name, hue=hue_name, palette="magma")
+    fig, ax = plt.subplots(figsize=(width, height))
+
+    # Класс без значений признака не отображается
+    stats = [
+        {**value, "label": label}
+        for label, value in box_stats.items()
+        if value is not None
+    ]
+    boxes = ax.bxp(stats, patch_artist=True)
+    for patch, color in zip(boxes["boxes"], sns.color_palette("magma", len(stats))):
+        patch.set_facecolor(color)
+
+    ax.set_xlabel("target")
     ax.set_title(plot_name)
 
     return fig
 
 
-def plot_kdeplot(
-    data, col_name, hue_name: str, plot_name: str, width: int = 4, height: int = 4
+def plot_kde_stats(
+    kde: dict, col_name: str, plot_name: str, width: int = 4, height: int = 4
 ) -> matplotlib.figure.Figure:
     """
-    Построение kdeplot
-    :param data:
-    :param col_name:
-    :param hue_name:
-    :param plot_name:
-    :param width:
-    :param height:
+    Построение графика плотности по сеткам, вычисленным на сервере
+    :param kde: словарь "класс - сетка x и значения плотности y"
+    :param col_name: название признака
+    :param plot_name: название графика
+    :param width: ширина
+    :param height: высота
     :return: fig
     """
-
     sns.set_style("whitegrid")
-    fig = plt.figure(figsize=(width, height))
-    ax = sns.kdeplot(
-        {
-            "target 0": data[data[hue_name] == 0][col_name],
-            "target 1": data[data[hue_name] == 1][col_name],
-        },
-        common_norm=False,
-        palette="viridis",
-        fill=True,
-    )
+    fig, ax = plt.subplots(figsize=(width, height))
+
+    for (label, grid), color in zip(kde.items(), sns.color_palette("viridis", len(kde))):
+        ax.plot(grid["x"], grid["y"], color=color, label=f"target {label}")
+        ax.fill_between(grid["x"], grid["y"], color=color, alpha=0.25)
 
+    ax.legend()
     ax.set_xlabel(col_name)
+    ax.set_ylabel("Density")
     ax.set_title(plot_name)
 
     return fig
@@ -0,0 +1,43 @@
+"""
+Программа: Кэширование построенных графиков в виде PNG
+Версия: 1.0
+"""
+
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+import streamlit as st
+
+from .charts import plot_bars_stats, plot_boxplot_stats, plot_kde_stats, plot_barplot
+
+# Функции построения графиков по виду графика
+PLOTS = {
+    "bars": plot_bars_stats,
+    "box": plot_boxplot_stats,
+    "kde": plot_kde_stats,
+    "words": plot_barplot,
+}
+
+# Максимальное количество хранимых изображений (вытесняются самые старые)
+MAX_FIGURES = 64
+
+
+@st.cache_data(max_entries=MAX_FIGURES, show_spinner=False)
+def render_plot(plot: str, version: str, name: str, _data, **params) -> bytes:
+    """
+    Построение графика и сохранение в PNG; ключ кэша - вид графика, версия
+    данных, название и параметры графика (данные в ключ не входят)
+    :param plot: вид графика (bars/box/kde/words)
+    :param version: версия данных для EDA
+    :param name: название набора данных графика (признак)
+    :param _data: данные для графика
+    :param params: параметры функции построения графика
+    :return: изображение в формате PNG
+    """
+    fig = PLOTS[plot](*_data, **params)
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+
+    return buffer.getvalue()
@@ -7,6 +7,7 @@
 import os
 import json
 from ..plotting.charts import plotting_trainer_stats
+from ..jobs.polling import wait_for_job
 import requests
 import streamlit as st
 
@@ -28,11 +29,16 @@ def start_training(config: dict, endpoint: object) -> None:
 
     with st.spinner("Training Bert... :)"):
 
-        output = requests.post(endpoint, timeout=8000)
+        output = requests.post(endpoint, timeout=60)
+        job = wait_for_job(config["endpoints"]["jobs"], output.json()["job_id"])
+
+    if job["status"] == "failed":
+        st.error(f"Ошибка обучения: {job['error']}")
+        return
 
     st.success("Training complete!")
 
-    new_metrics = output.json()["metrics"]
+    new_metrics = job["result"]["metrics"]
 
     roc_auc, precision, recall, f1_metric, logloss = st.columns(5)
     roc_auc.metric(